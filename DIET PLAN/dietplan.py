@@ -1,6 +1,6 @@
 import streamlit as st
-import google.generativeai as genai
 import os
+import sys
 from dotenv import load_dotenv
 import plotly.express as px
 import requests
@@ -9,8 +9,10 @@ import pandas as pd
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Shared Gemini client (timeouts, retries) lives with the main app in PTL/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PTL'))
+from llm import generate
+from token_budget import length_hint
 
 # Nutritionix API configuration
 NUTRITIONIX_APP_ID = os.getenv("NUTRITIONIX_APP_ID")
@@ -28,12 +30,10 @@ def generate_diet_plan(diseases):
     4. 3 lifestyle tips
     5. Recommended daily calorie intake
 
-    Format in Markdown, keep it brief and easy to read.
+    Format in Markdown, keep it brief and easy to read. {length_hint('generate_diet_plan')}
     """
 
-    model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content(prompt)
-    return response.text
+    return generate(prompt, endpoint='generate_diet_plan')
 
 
 def generate_roadmap(diseases):
@@ -50,11 +50,11 @@ def generate_roadmap(diseases):
     - A target value for that metric
 
     Format as a list of 9 items, each containing: time frame, goal, metric, target value.
+    {length_hint('generate_roadmap')}
     """
 
-    model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content(prompt)
-    return [item.strip() for item in response.text.split('\n') if item.strip()]
+    text = generate(prompt, endpoint='generate_roadmap')
+    return [item.strip() for item in text.split('\n') if item.strip()]
 
 
 def create_nutrient_chart(foods):
@@ -1,35 +1,62 @@
+import importlib
+import os
+import time
 import streamlit as st
-import healthy
-import ingredients
-import disease
-import diet_recommender
-import ocr
-import home
 # Move this line to the top, outside of any function
 st.set_page_config(page_title="Food Safety & Health Analyzer", page_icon="🍽️")
 
+# Sidebar page -> (module, title). A page's module is only imported the first time it is opened,
+# so sessions that never visit Home don't pay for TensorFlow and the MobileNetV2 weights.
+PAGES = {
+    "Home": ("home", "NutriScan-AI"),
+    "Ingredient Analysis": ("ingredients", "🧪 Ingredient Analysis"),
+    "Disease Prediction": ("disease", "🩺 Disease Prediction"),
+    "Diet Recommendation": ("diet_recommender", "🍽️ AI-Powered Personalized Diet Recommender"),
+    "Packed Food Analysis": ("ocr", "🔎 Packed Food Analysis"),
+    # "Healthy Food Analysis": ("healthy", "🥗 Healthy Food Analysis"),
+}
+# Operator pages, only listed when ADMIN_PAGES=1
+if os.getenv("ADMIN_PAGES") == "1":
+    PAGES["LLM Usage"] = ("llm_admin", "📈 LLM Usage")
+
+@st.cache_resource
+def page_registry():
+    # Shared by all sessions in this process
+    return {"modules": {}, "import_times": {}}
+
+def load_page(module_name):
+    registry = page_registry()
+    if module_name not in registry["modules"]:
+        start = time.perf_counter()
+        registry["modules"][module_name] = importlib.import_module(module_name)
+        registry["import_times"][module_name] = time.perf_counter() - start
+    return registry["modules"][module_name]
+
+# Prometheus exporter for LLM metrics (LLM_METRICS_PORT), started once per app process
+@st.cache_resource
+def metrics_server():
+    from llm_metrics import METRICS_PORT
+    if not METRICS_PORT:
+        return None
+    from llm import start_metrics_server
+    return start_metrics_server()
+
+def show_import_times():
+    import_times = page_registry()["import_times"]
+    if import_times:
+        with st.sidebar.expander("Page load times"):
+            for module_name, seconds in import_times.items():
+                st.write(f"{module_name}: {seconds * 1000:.0f} ms")
+
 def main():
+    metrics_server()
     st.sidebar.title("Navigation")
-    page = st.sidebar.selectbox("Choose a page", ["Home", "Ingredient Analysis","Disease Prediction", "Diet Recommendation","Packed Food Analysis"])
-
-    # if page == "Healthy Food Analysis":
-    #     st.title("🥗 Healthy Food Analysis")
-    #     healthy.main()
-    if page == "Ingredient Analysis":
-        st.title("🧪 Ingredient Analysis")
-        ingredients.main()
-    elif page == "Home":
-        st.title("NutriScan-AI")
-        home.main()
-    elif page == "Disease Prediction":
-        st.title("🩺 Disease Prediction")
-        disease.main()
-    elif page == "Packed Food Analysis":
-        st.title("🔎 Packed Food Analysis")
-        ocr.main()
-    else:
-        st.title("🍽️ AI-Powered Personalized Diet Recommender")
-        diet_recommender.main()
+    page = st.sidebar.selectbox("Choose a page", list(PAGES))
+
+    module_name, title = PAGES[page]
+    st.title(title)
+    load_page(module_name).main()
+    show_import_times()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+import numpy as np
+
+MAX_BATCH_SIZE = int(os.getenv("BATCH_MAX_SIZE", 16))
+MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 5))
+
+
+class MicroBatcher:
+    """Queue classification requests from every session and run them through the model together.
+
+    A scheduler thread takes the first waiting request, then keeps collecting more until
+    max_batch_size rows are gathered or max_wait_ms has passed, runs one forward pass and hands
+    each caller its slice of the predictions. Wraps any backend from inference.py and exposes the
+    same predict(batch) method, so callers don't need to know it's there.
+
+    With concurrency > 1, several scheduler threads take turns forming batches so that a backend
+    which can run batches in parallel (e.g. a WorkerPool) is kept busy.
+
+    Requests for embeddings share batches with plain ones: when any request in a batch wants
+    them, the whole batch runs through the backend's predict_with_embeddings instead.
+    """
+
+    def __init__(self, backend, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, concurrency=1):
+        self.backend = backend
+        self.name = backend.name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.carry = None  # Request that didn't fit in the previous batch
+        self.lock = threading.Lock()
+        self.collect_lock = threading.Lock()  # Only one thread forms a batch at a time
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = Counter()
+        self.threads = [threading.Thread(target=self._run, name=f"micro-batcher-{i}", daemon=True)
+                        for i in range(concurrency)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, batch, with_embeddings=False):
+        future = Future()
+        # Copy so the caller can reuse its input buffer while the request waits in the queue
+        self.queue.put((np.array(batch, dtype=np.float32), future, with_embeddings))
+        return future
+
+    def predict(self, batch):
+        return self.submit(batch).result()
+
+    def predict_with_embeddings(self, batch):
+        """(predictions, embeddings) for batch; the backend must support predict_with_embeddings."""
+        return self.submit(batch, with_embeddings=True).result()
+
+    def _collect(self):
+        if self.carry is not None:
+            items, self.carry = [self.carry], None
+        else:
+            items = [self.queue.get()]
+        rows = len(items[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if rows + len(item[0]) > self.max_batch_size:
+                self.carry = item
+                break
+            items.append(item)
+            rows += len(item[0])
+        return items, rows
+
+    def _run(self):
+        while True:
+            with self.collect_lock:
+                items, rows = self._collect()
+            batch = items[0][0] if len(items) == 1 else np.concatenate([b for b, _, _ in items])
+            embed = any(with_embeddings for _, _, with_embeddings in items)
+            try:
+                if embed:
+                    predictions, embeddings = self.backend.predict_with_embeddings(batch)
+                else:
+                    predictions = self.backend.predict(batch)
+            except Exception as e:
+                for _, future, _ in items:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for b, future, with_embeddings in items:
+                part = slice(offset, offset + len(b))
+                future.set_result((predictions[part], embeddings[part]) if with_embeddings else predictions[part])
+                offset += len(b)
+
+            with self.lock:
+                self.requests += len(items)
+                self.batches += 1
+                self.batch_sizes[rows] += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queue_depth": self.queue.qsize() + (self.carry is not None),
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": sum(size * n for size, n in self.batch_sizes.items()) / max(self.batches, 1),
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            }
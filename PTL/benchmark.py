@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import subprocess
+import time
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from inference import MODEL_PATH, IMG_SIZE, BACKENDS, compile_inference_fn, run_inference, load_backend
+
+# Usage: python benchmark.py [--stage inference|preprocess|suite] [--runs N] [--output results.json]
+#
+# The suite times each classifier stage separately (decode, resize/normalize, forward pass,
+# argmax/label mapping) for every available backend and batch sizes 1-64, and writes
+# p50/p95/p99 and throughput as JSON so runs can be diffed across commits.
+
+SAMPLE_IMAGES = ['burger.jpg', 'pizza.jpg', 'panipuri.jpg', 'shawarma.jpg']
+SUITE_IMAGES = SAMPLE_IMAGES + ['burger.avif']
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def time_calls(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.array(samples)
+
+
+def report(name, samples):
+    p50, p99 = np.percentile(samples, [50, 99])
+    print(f"{name:<24} p50: {p50:7.2f} ms   p99: {p99:7.2f} ms")
+
+
+def bench_inference(runs):
+    import tensorflow as tf
+    model = tf.keras.models.load_model(MODEL_PATH)
+    infer = compile_inference_fn(model)
+    batch = np.random.rand(1, IMG_SIZE, IMG_SIZE, 3).astype('float32')
+
+    # Warm up model.predict as well so both paths are compared steady-state
+    model.predict(batch, verbose=0)
+
+    print(f"Single-image latency over {runs} runs")
+    report("model.predict", time_calls(lambda: model.predict(batch, verbose=0), runs))
+    report("compiled infer", time_calls(lambda: run_inference(infer, batch), runs))
+
+
+def baseline_preprocess(data):
+    # The original Home page path: full decode, resize, float copy, then a separate divide
+    img = Image.open(BytesIO(data)).resize((IMG_SIZE, IMG_SIZE))
+    img_array = np.array(img, dtype='float32')
+    img_array = np.expand_dims(img_array, axis=0)
+    img_array /= 255.0
+    return img_array
+
+
+def bench_preprocess(runs):
+    from preprocessing import preprocess_batch
+
+    print(f"Decode + preprocess latency over {runs} runs")
+    for name in SAMPLE_IMAGES:
+        with open(os.path.join(SAMPLE_DIR, name), 'rb') as f:
+            data = f.read()
+        print(name)
+        report("  baseline", time_calls(lambda: baseline_preprocess(data), runs))
+        report("  draft decode + fused", time_calls(lambda: preprocess_batch([data]), runs))
+
+
+def summarize(samples_ms, batch_size=1):
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'throughput_ips': round(batch_size * 1000 / float(np.mean(samples_ms)), 1),
+    }
+
+
+def load_suite_images():
+    images, skipped = [], []
+    for name in SUITE_IMAGES:
+        with open(os.path.join(SAMPLE_DIR, name), 'rb') as f:
+            data = f.read()
+        try:
+            Image.open(BytesIO(data)).load()
+        except Exception:
+            # e.g. AVIF without a Pillow plugin installed
+            skipped.append(name)
+            continue
+        images.append(data)
+    return images, skipped
+
+
+def available_backends():
+    backends = []
+    for name in BACKENDS:
+        try:
+            backends.append(load_backend(name))
+        except Exception as e:
+            print(f"Skipping {name} backend: {type(e).__name__}: {e}")
+    return backends
+
+
+def time_pipeline(backend, images, batch_size, runs):
+    from preprocessing import open_image, batch_buffer, decode_image, SCALE
+    from food_classes import food_classes
+
+    inputs = [images[i % len(images)] for i in range(batch_size)]
+    stages = {'decode': [], 'resize_normalize': [], 'forward': [], 'postprocess': [], 'total': []}
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        decoded = []
+        for data in inputs:
+            img = open_image(data)
+            if img.format == 'JPEG':
+                img.draft('RGB', (IMG_SIZE, IMG_SIZE))
+            img.load()
+            decoded.append(img)
+        t1 = time.perf_counter()
+        batch = batch_buffer(batch_size)
+        for i, img in enumerate(decoded):
+            np.multiply(np.asarray(decode_image(img), dtype=np.uint8), SCALE, out=batch[i], casting='unsafe')
+        t2 = time.perf_counter()
+        predictions = backend.predict(batch)
+        t3 = time.perf_counter()
+        [food_classes[i] for i in np.argmax(predictions, axis=1)]
+        t4 = time.perf_counter()
+        for name, start, end in (('decode', t0, t1), ('resize_normalize', t1, t2), ('forward', t2, t3),
+                                 ('postprocess', t3, t4), ('total', t0, t4)):
+            stages[name].append((end - start) * 1000)
+    return {name: summarize(samples, batch_size) for name, samples in stages.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_suite(runs, output):
+    images, skipped = load_suite_images()
+    report_data = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'runs': runs,
+        'images': len(images),
+        'skipped_images': skipped,
+        'results': [],
+    }
+    for backend in available_backends():
+        # One untimed pass per batch size so shape changes (e.g. TFLite tensor resizes) aren't measured
+        for batch_size in BATCH_SIZES:
+            time_pipeline(backend, images, batch_size, 1)
+            stages = time_pipeline(backend, images, batch_size, runs)
+            report_data['results'].append({'backend': backend.name, 'batch_size': batch_size, 'stages': stages})
+            total = stages['total']
+            print(f"{backend.name:<8} batch {batch_size:>2}   p50 {total['p50_ms']:8.2f} ms   "
+                  f"p99 {total['p99_ms']:8.2f} ms   {total['throughput_ips']:8.1f} img/s")
+
+    text = json.dumps(report_data, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text)
+        print(f"Wrote {output}")
+    else:
+        print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stage', choices=['inference', 'preprocess', 'suite'], default='inference')
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--output', help="JSON file for --stage suite (default: stdout)")
+    args = parser.parse_args()
+
+    if args.stage == 'inference':
+        bench_inference(args.runs)
+    elif args.stage == 'preprocess':
+        bench_preprocess(args.runs)
+    else:
+        bench_suite(args.runs, args.output)
+
+
+if __name__ == '__main__':
+    main()
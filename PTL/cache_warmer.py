@@ -0,0 +1,165 @@
+import argparse
+import datetime
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from food_kb import FOOD_ANALYSIS_PROMPT, PROMPT_VERSION, load_food_kb, lookup_food, parse_analysis
+from query_log import read_queries
+
+# Pre-populates the LLM response cache with the most popular recent queries, so the morning's
+# first users get cached answers instead of waiting on Gemini. Meant to run from cron in the
+# off-peak window, e.g.
+#   30 2 * * *  cd PTL && python cache_warmer.py
+
+# Local hours (inclusive, may wrap past midnight) in which the warmer is allowed to run
+WARM_HOURS = os.getenv("CACHE_WARM_HOURS", "1-6")
+WARM_CONCURRENCY = int(os.getenv("CACHE_WARM_CONCURRENCY", 2))
+# Gemini calls and wall-clock minutes one run may spend
+WARM_MAX_REQUESTS = int(os.getenv("CACHE_WARM_MAX_REQUESTS", 200))
+WARM_MAX_MINUTES = float(os.getenv("CACHE_WARM_MAX_MINUTES", 60))
+
+
+def in_window(hours=WARM_HOURS, now=None):
+    start, end = (int(hour) for hour in hours.split('-'))
+    hour = (now or datetime.datetime.now()).hour
+    if start <= end:
+        return start <= hour <= end
+    return hour >= start or hour <= end
+
+
+def most_common(records, key_fn, top, min_count):
+    """The top most frequent (key, first record with that key, count), ignoring keys seen fewer than min_count times."""
+    counts = Counter()
+    examples = {}
+    for record in records:
+        key = key_fn(record['params'])
+        if key is None:
+            continue
+        counts[key] += 1
+        examples.setdefault(key, record['params'])
+    return [(key, examples[key], count) for key, count in counts.most_common(top) if count >= min_count]
+
+
+def food_key(params):
+    name = ' '.join(params.get('food_name', '').lower().split())
+    return name or None
+
+
+def risk_key(params):
+    food_item = ' '.join(params.get('food_item', '').lower().split())
+    if not food_item or not params.get('ingredients'):
+        return None
+    return food_item, tuple(params['ingredients']), params.get('consumption_frequency')
+
+
+def food_jobs(records, top, min_count):
+    # Classifier labels are answered from the knowledge base and never reach the LLM
+    kb = load_food_kb()
+    jobs = []
+    for _, params, count in most_common(records, food_key, top, min_count):
+        if lookup_food(kb, params['food_name']):
+            continue
+        jobs.append({
+            'endpoint': 'analyze_food',
+            'label': params['food_name'],
+            'prompt': FOOD_ANALYSIS_PROMPT.format(food_name=params['food_name']),
+            'prompt_version': PROMPT_VERSION,
+            'validate': lambda text: parse_analysis(text.strip()),
+            'count': count,
+        })
+    return jobs
+
+
+def risk_jobs(records, top, min_count):
+    from disease import health_risk_prompt
+    jobs = []
+    for _, params, count in most_common(records, risk_key, top, min_count):
+        jobs.append({
+            'endpoint': 'predict_health_risks',
+            'label': f"{params['food_item']} ({params['consumption_frequency']})",
+            'prompt': health_risk_prompt(params['food_item'], params['ingredients'], params['consumption_frequency']),
+            'prompt_version': 1,
+            'validate': None,
+            'count': count,
+        })
+    return jobs
+
+
+def warm(jobs, concurrency=WARM_CONCURRENCY, max_requests=WARM_MAX_REQUESTS, max_minutes=WARM_MAX_MINUTES,
+         dry_run=False):
+    """Answer the jobs not already cached, most popular first, within the request and time quota."""
+    from llm import MODEL_NAME, LLMError, cacheable, generate_uncached, get_cache
+    from token_budget import apply_budget
+
+    cache = get_cache()
+    if cache is None:
+        raise SystemExit("The LLM response cache is disabled (LLM_CACHE_ENABLED=0); nothing to warm")
+    jobs = sorted(jobs, key=lambda job: job['count'], reverse=True)
+    pending = [job for job in jobs if not cache.contains(job['prompt'], MODEL_NAME, job['prompt_version'])]
+    summary = {'candidates': len(jobs), 'already_cached': len(jobs) - len(pending), 'warmed': 0, 'failed': 0,
+               'skipped': max(0, len(pending) - max_requests)}
+    pending = pending[:max_requests]
+    if dry_run:
+        for job in pending:
+            print(f"would warm {job['endpoint']}: {job['label']} ({job['count']} queries)")
+        summary['would_warm'] = len(pending)
+        return summary
+
+    stop_at = time.monotonic() + max_minutes * 60
+
+    def run(job):
+        if time.monotonic() > stop_at:
+            return False
+        # Same generation config as the pages, but bypassing cache lookups so the hit/miss stats stay honest
+        kwargs = apply_budget(job['endpoint'], {})
+        text = generate_uncached(job['prompt'], MODEL_NAME, endpoint=job['endpoint'], **kwargs)
+        if not cacheable(text, job['validate']):
+            raise ValueError("response could not be parsed")
+        cache.set(job['endpoint'], job['prompt'], MODEL_NAME, text, job['prompt_version'])
+        return True
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(run, job): job for job in pending}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                warmed = future.result()
+            except (LLMError, ValueError) as e:
+                summary['failed'] += 1
+                print(f"failed {job['endpoint']}: {job['label']}: {e}")
+                continue
+            if warmed:
+                summary['warmed'] += 1
+                print(f"warmed {job['endpoint']}: {job['label']} ({job['count']} queries)")
+            else:
+                summary['skipped'] += 1
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=7, help="how many days of query logs to read")
+    parser.add_argument('--top', type=int, default=100, help="most popular queries to consider per endpoint")
+    parser.add_argument('--min-count', type=int, default=2, help="ignore queries asked fewer times than this")
+    parser.add_argument('--concurrency', type=int, default=WARM_CONCURRENCY)
+    parser.add_argument('--max-requests', type=int, default=WARM_MAX_REQUESTS)
+    parser.add_argument('--max-minutes', type=float, default=WARM_MAX_MINUTES)
+    parser.add_argument('--hours', default=WARM_HOURS, help="allowed local hours, e.g. 1-6 or 22-5")
+    parser.add_argument('--force', action='store_true', help="run even outside the allowed hours")
+    parser.add_argument('--dry-run', action='store_true', help="list what would be warmed without calling the LLM")
+    args = parser.parse_args()
+
+    if not args.force and not in_window(args.hours):
+        print(f"Outside the warming window ({args.hours}); use --force to run anyway")
+        return
+
+    records = list(read_queries(args.days))
+    jobs = food_jobs([r for r in records if r['endpoint'] == 'analyze_food'], args.top, args.min_count)
+    jobs += risk_jobs([r for r in records if r['endpoint'] == 'predict_health_risks'], args.top, args.min_count)
+    summary = warm(jobs, args.concurrency, args.max_requests, args.max_minutes, args.dry_run)
+    print(f"{len(records)} logged queries; " + ", ".join(f"{key}: {value}" for key, value in summary.items()))
+
+
+if __name__ == '__main__':
+    main()
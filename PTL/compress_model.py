@@ -0,0 +1,193 @@
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from inference import MODEL_PATH, IMG_SIZE, KerasBackend, TFLiteBackend
+
+# Usage: python compress_model.py --data-dir D:\BITNBUILD2024\food101\images [--max-top1-drop 0.01]
+#
+# Builds int8-quantized, magnitude-pruned and weight-clustered variants of the Food-101 model,
+# scores each on the same held-out split foodtrain101.ipynb validated on, and only publishes
+# variants whose top-1 accuracy stays within the configured margin of the float32 model.
+# Every variant is published as an optimized TFLite file: pruned and clustered weights saved
+# back to .h5 are still dense float32 and no smaller than the original.
+
+BATCH_SIZE = 32
+VARIANTS = ['int8', 'pruned', 'clustered']
+
+
+def load_split(data_dir, subset, shuffle):
+    # Same generator settings as foodtrain101.ipynb, so 'validation' is the split it held out
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+    datagen = ImageDataGenerator(rescale=1./255, validation_split=0.2)
+    return datagen.flow_from_directory(data_dir, target_size=(IMG_SIZE, IMG_SIZE), batch_size=BATCH_SIZE,
+                                       class_mode='categorical', subset=subset, shuffle=shuffle)
+
+
+def evaluate(backend, data, max_batches=None):
+    """Top-1/top-5 accuracy of any inference backend over a generator."""
+    batches = len(data) if max_batches is None else min(len(data), max_batches)
+    top1 = top5 = total = 0
+    for i in range(batches):
+        images, labels = data[i]
+        predictions = backend.predict(images)
+        targets = np.argmax(labels, axis=1)
+        ranked = np.argsort(predictions, axis=1)[:, ::-1][:, :5]
+        top1 += int(np.sum(ranked[:, 0] == targets))
+        top5 += int(np.sum(np.any(ranked == targets[:, None], axis=1)))
+        total += len(targets)
+    return {'top1': top1 / total, 'top5': top5 / total, 'samples': total}
+
+
+def convert_tflite(model, output_path, optimizations, representative_dataset=None):
+    """Write model as a TFLite flatbuffer with the given converter optimizations."""
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = optimizations
+    if representative_dataset is not None:
+        converter.representative_dataset = representative_dataset
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return TFLiteBackend(output_path)
+
+
+def gzipped_size(path):
+    """Size of path after gzip, which is what clustered and pruned weights shrink on the wire."""
+    with open(path, 'rb') as f:
+        return len(gzip.compress(f.read(), compresslevel=9))
+
+
+def build_int8(model_path, output_path, train_data, calibration_batches=20):
+    """Post-training int8 quantization calibrated on training images. Keeps float32 input/output."""
+    import tensorflow as tf
+    model = tf.keras.models.load_model(model_path)
+
+    def representative_dataset():
+        for i in range(min(calibration_batches, len(train_data))):
+            for image in train_data[i][0]:
+                yield [image[None].astype(np.float32)]
+
+    return convert_tflite(model, output_path, [tf.lite.Optimize.DEFAULT], representative_dataset)
+
+
+def head_layers(model):
+    import tensorflow as tf
+    return [layer.name for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)]
+
+
+def fine_tune(model, train_data, epochs, callbacks=()):
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    model.fit(train_data, epochs=epochs, steps_per_epoch=len(train_data), callbacks=list(callbacks))
+
+
+def build_pruned(model_path, output_path, train_data, epochs, sparsity=0.5):
+    """Magnitude-prune the Dense head (the 1024-unit layer holds most of the trainable weights).
+
+    Converted with sparsity-aware TFLite optimizations, so the zeroed weights are actually dropped.
+    """
+    import tensorflow as tf
+    import tensorflow_model_optimization as tfmot
+    model = tf.keras.models.load_model(model_path)
+    dense = set(head_layers(model))
+    schedule = tfmot.sparsity.keras.ConstantSparsity(sparsity, begin_step=0, frequency=100)
+
+    def prune(layer):
+        if layer.name in dense:
+            return tfmot.sparsity.keras.prune_low_magnitude(layer, pruning_schedule=schedule)
+        return layer
+
+    pruned = tf.keras.models.clone_model(model, clone_function=prune)
+    fine_tune(pruned, train_data, epochs, [tfmot.sparsity.keras.UpdatePruningStep()])
+    return convert_tflite(tfmot.sparsity.keras.strip_pruning(pruned), output_path,
+                          [tf.lite.Optimize.DEFAULT, tf.lite.Optimize.EXPERIMENTAL_SPARSITY])
+
+
+def build_clustered(model_path, output_path, train_data, epochs, clusters=16):
+    """Cluster the Dense head's weights into a small shared codebook, then quantize to TFLite."""
+    import tensorflow as tf
+    import tensorflow_model_optimization as tfmot
+    model = tf.keras.models.load_model(model_path)
+    dense = set(head_layers(model))
+    params = {
+        'number_of_clusters': clusters,
+        'cluster_centroids_init': tfmot.clustering.keras.CentroidInitialization.KMEANS_PLUS_PLUS,
+    }
+
+    def cluster(layer):
+        if layer.name in dense:
+            return tfmot.clustering.keras.cluster_weights(layer, **params)
+        return layer
+
+    clustered = tf.keras.models.clone_model(model, clone_function=cluster)
+    fine_tune(clustered, train_data, epochs)
+    return convert_tflite(tfmot.clustering.keras.strip_clustering(clustered), output_path,
+                          [tf.lite.Optimize.DEFAULT])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', required=True, help="Food-101 images directory, one folder per class")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--output-dir', default='compressed')
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=VARIANTS)
+    parser.add_argument('--max-top1-drop', type=float, default=0.01,
+                        help="Largest top-1 accuracy loss (absolute) a variant may have and still be published")
+    parser.add_argument('--finetune-epochs', type=int, default=1)
+    parser.add_argument('--eval-batches', type=int, help="Evaluate on only the first N validation batches")
+    args = parser.parse_args()
+
+    train_data = load_split(args.data_dir, 'training', shuffle=True)
+    val_data = load_split(args.data_dir, 'validation', shuffle=False)
+
+    baseline = evaluate(KerasBackend(args.model), val_data, args.eval_batches)
+    print(f"baseline   top-1 {baseline['top1']:.4f}   top-5 {baseline['top5']:.4f}")
+    manifest = {
+        'source_model': os.path.basename(args.model),
+        'source_size_bytes': os.path.getsize(args.model),
+        'source_gzip_size_bytes': gzipped_size(args.model),
+        'baseline': baseline,
+        'max_top1_drop': args.max_top1_drop,
+        'variants': {},
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='compress_')
+    builders = {
+        'int8': ('food101_mobilenetv2_int8.tflite', lambda path: build_int8(args.model, path, train_data)),
+        'pruned': ('food101_mobilenetv2_pruned.tflite',
+                   lambda path: build_pruned(args.model, path, train_data, args.finetune_epochs)),
+        'clustered': ('food101_mobilenetv2_clustered.tflite',
+                      lambda path: build_clustered(args.model, path, train_data, args.finetune_epochs)),
+    }
+    try:
+        for variant in args.variants:
+            filename, build = builders[variant]
+            work_path = os.path.join(work_dir, filename)
+            scores = evaluate(build(work_path), val_data, args.eval_batches)
+            drop = baseline['top1'] - scores['top1']
+            published = drop <= args.max_top1_drop
+            if published:
+                shutil.copy(work_path, os.path.join(args.output_dir, filename))
+            manifest['variants'][variant] = {
+                'file': filename,
+                'size_bytes': os.path.getsize(work_path),
+                'gzip_size_bytes': gzipped_size(work_path),
+                **scores,
+                'top1_drop': drop,
+                'published': published,
+            }
+            status = "published" if published else f"REJECTED (top-1 drop {drop:.4f} > {args.max_top1_drop})"
+            print(f"{variant:<10} top-1 {scores['top1']:.4f}   top-5 {scores['top5']:.4f}   "
+                  f"{os.path.getsize(work_path) / 1e6:.1f} MB   {status}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(os.path.join(args.output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
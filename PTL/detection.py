@@ -0,0 +1,77 @@
+import os
+import numpy as np
+from PIL import ImageDraw
+from preprocessing import open_image, preprocess_batch
+
+# Local YOLOv5 checkout and weights, e.g. from the clone in Foodpredictor.ipynb
+DETECTOR_REPO = os.getenv("DETECTOR_REPO", "yolov5")
+DETECTOR_WEIGHTS = os.getenv("DETECTOR_WEIGHTS")
+MIN_REGION_SCORE = float(os.getenv("DETECTOR_MIN_SCORE", 0.3))
+MAX_REGIONS = 12
+
+
+class YoloDetector:
+    """Region proposals from a locally stored YOLOv5 model. Only the boxes are used."""
+
+    def __init__(self, weights_path=DETECTOR_WEIGHTS, repo_dir=DETECTOR_REPO):
+        import torch
+        self.model = torch.hub.load(repo_dir, 'custom', path=weights_path, source='local')
+
+    def detect(self, img):
+        results = self.model(img)
+        return [((x1, y1, x2, y2), score) for x1, y1, x2, y2, score, _ in results.xyxy[0].tolist()]
+
+
+class StubDetector:
+    """Returns fixed boxes, or the whole image when none are given. Useful for tests and demos."""
+
+    def __init__(self, boxes=None):
+        self.boxes = boxes
+
+    def detect(self, img):
+        if self.boxes is None:
+            return [((0, 0, img.width, img.height), 1.0)]
+        return [(box, 1.0) for box in self.boxes]
+
+
+def crop_regions(img, regions, min_score=MIN_REGION_SCORE, max_regions=MAX_REGIONS, min_size=32):
+    regions = sorted((r for r in regions if r[1] >= min_score), key=lambda r: r[1], reverse=True)
+    crops, boxes = [], []
+    for (x1, y1, x2, y2), score in regions[:max_regions]:
+        box = (max(0, int(x1)), max(0, int(y1)), min(img.width, int(x2)), min(img.height, int(y2)))
+        # Tiny boxes are usually garnish or noise and classify badly at 224x224
+        if box[2] - box[0] < min_size or box[3] - box[1] < min_size:
+            continue
+        crops.append(img.crop(box))
+        boxes.append(box)
+    return crops, boxes
+
+
+def detect_and_classify(source, detector, predict, labels, min_score=MIN_REGION_SCORE, max_regions=MAX_REGIONS):
+    """Detect dish regions and classify every crop in one batched forward pass.
+
+    predict takes a float32 batch and returns class probabilities, like the backends in
+    inference.py. Falls back to the whole image when no region survives filtering.
+    Returns a list of {'box', 'label', 'confidence'} dicts.
+    """
+    img = open_image(source).convert('RGB')
+    crops, boxes = crop_regions(img, detector.detect(img), min_score, max_regions)
+    if not crops:
+        crops, boxes = [img], [(0, 0, img.width, img.height)]
+
+    predictions = predict(preprocess_batch(crops))
+    indices = np.argmax(predictions, axis=1)
+    return [
+        {'box': box, 'label': labels[i], 'confidence': float(row[i])}
+        for box, i, row in zip(boxes, indices, predictions)
+    ]
+
+
+def draw_regions(source, regions):
+    img = open_image(source).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for region in regions:
+        draw.rectangle(region['box'], outline=(76, 175, 80), width=4)
+        x1, y1 = region['box'][:2]
+        draw.text((x1 + 6, y1 + 4), f"{region['label']} {region['confidence']:.2f}", fill=(255, 255, 255))
+    return img
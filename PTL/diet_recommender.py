@@ -1,14 +1,13 @@
 import streamlit as st
 import pandas as pd
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+from llm import generate, generate_stream
+from token_budget import length_hint
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 def calculate_bmr(weight, height, age, gender):
     if gender == "Male":
@@ -26,9 +25,8 @@ def calculate_tdee(bmr, activity_level):
     }
     return bmr * activity_multipliers[activity_level]
 
-def get_ai_recommendations(user_info, calorie_target):
-    model = genai.GenerativeModel('gemini-pro')
-    prompt = f"""
+def recommendation_prompt(user_info, calorie_target):
+    return f"""
     As a nutritionist, provide personalized diet recommendations for a person with the following profile:
 
     Age: {user_info['age']}
@@ -47,10 +45,15 @@ def get_ai_recommendations(user_info, calorie_target):
     4. Two practical tips for maintaining this diet and working towards their goal.
     5. A sample one-day meal plan that fits their calorie target and aligns with their goals and health considerations.
 
-    Format the response in Markdown for easy reading.
+    Format the response in Markdown for easy reading. {length_hint('get_ai_recommendations')}
     """
-    response = model.generate_content(prompt)
-    return response.text
+
+def get_ai_recommendations(user_info, calorie_target):
+    return generate(recommendation_prompt(user_info, calorie_target), endpoint='get_ai_recommendations')
+
+def stream_ai_recommendations(user_info, calorie_target):
+    """Same as get_ai_recommendations, but yields the Markdown as it is generated."""
+    return generate_stream(recommendation_prompt(user_info, calorie_target), endpoint='get_ai_recommendations')
 
 def main():
     st.write("Enter your details below to get a personalized diet recommendation.")
@@ -75,26 +78,23 @@ def main():
                                  "e.g., Diabetes, Gluten intolerance, Vegetarian, High blood pressure")
     
     if st.button("Generate AI Diet Recommendation"):
-        with st.spinner("Generating your personalized diet plan..."):
-            bmr = calculate_bmr(weight, height, age, gender)
-            tdee = calculate_tdee(bmr, activity_level)
-            calorie_target = tdee  # Adjusting calorie target based on goals will be handled by the AI
-            
-            user_info = {
-                "age": age,
-                "gender": gender,
-                "weight": weight,
-                "height": height,
-                "activity_level": activity_level,
-                "goal": goal,
-                "health_issues": health_issues
-            }
-            
-            ai_recommendation = get_ai_recommendations(user_info, calorie_target)
-
-            st.subheader("Your Personalized AI Diet Recommendation")
-            st.write(f"Estimated Daily Energy Expenditure: {tdee:.0f} calories")
-            st.markdown(ai_recommendation)
+        bmr = calculate_bmr(weight, height, age, gender)
+        tdee = calculate_tdee(bmr, activity_level)
+        calorie_target = tdee  # Adjusting calorie target based on goals will be handled by the AI
+        
+        user_info = {
+            "age": age,
+            "gender": gender,
+            "weight": weight,
+            "height": height,
+            "activity_level": activity_level,
+            "goal": goal,
+            "health_issues": health_issues
+        }
+        
+        st.subheader("Your Personalized AI Diet Recommendation")
+        st.write(f"Estimated Daily Energy Expenditure: {tdee:.0f} calories")
+        st.write_stream(stream_ai_recommendations(user_info, calorie_target))
 
         st.info("Note: While this AI-generated plan is personalized based on your input, it's always recommended to consult with a registered dietitian or healthcare provider for professional advice, especially if you have specific health concerns.")
 
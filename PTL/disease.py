@@ -1,5 +1,4 @@
 import streamlit as st
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import re
@@ -8,15 +7,18 @@ import plotly.graph_objs as go
 import plotly.express as px
 import pandas as pd
 from Components.charts import *
+from llm import generate, generate_stream
+from token_budget import length_hint
+from semantic_cache import context_key, get_semantic_cache, normalize_query
+from semantic_feedback import note_semantic_match, show_semantic_match_feedback
+from query_log import log_query
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-def predict_health_risks(food_item, ingredients, consumption_frequency):
-    prompt = f"""
+def health_risk_prompt(food_item, ingredients, consumption_frequency):
+    return f"""
     As a food safety and health expert, analyze the following food item and its ingredients:
 
     Food Item: {food_item}
@@ -37,12 +39,67 @@ def predict_health_risks(food_item, ingredients, consumption_frequency):
 
 
     Present your analysis in a structured, easy-to-read format with bullet points or numbered lists where appropriate.
+    {length_hint('predict_health_risks')}
     
     Note: Do not change the format of the 5th section
     """
-    model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content(prompt)
-    return response.text
+
+
+def predict_health_risks(food_item, ingredients, consumption_frequency):
+    prompt = health_risk_prompt(food_item, ingredients, consumption_frequency)
+    return generate(prompt, endpoint='predict_health_risks')
+
+
+def stream_health_risks(food_item, ingredients, consumption_frequency):
+    """Same as predict_health_risks, but yields the analysis as it is generated."""
+    prompt = health_risk_prompt(food_item, ingredients, consumption_frequency)
+    return generate_stream(prompt, endpoint='predict_health_risks')
+
+
+def semantic_context(ingredients, consumption_frequency):
+    # Only the food item is matched loosely; the ingredients, frequency and prompt template must be the same
+    template = health_risk_prompt('', [], '')
+    return context_key(template, sorted(normalize_query(i) for i in ingredients), consumption_frequency)
+
+
+def show_health_risks(food_item, ingredients, consumption_frequency, exact=False):
+    if not exact:
+        log_query('predict_health_risks', food_item=food_item, ingredients=ingredients,
+                  consumption_frequency=consumption_frequency)
+    st.subheader("📊 Detailed Analysis Results")
+    st.write("---")
+
+    # The charts need the finished analysis, so reserve their place and stream the text below them
+    col1, col2 = st.columns(2)
+    gauge_slot = col1.empty()
+    radar_slot = col2.empty()
+
+    st.subheader("📊 Detailed Analysis Results")
+    st.markdown("### 🚨 Health Risk Prediction:")
+
+    # A food item close to one analysed before with the same ingredients and frequency reuses that analysis
+    cache = get_semantic_cache()
+    context = semantic_context(ingredients, consumption_frequency)
+    match = cache.lookup('predict_health_risks', food_item, context) if cache is not None and not exact else None
+    note_semantic_match('risk_semantic_match', food_item, match, context)
+    if match:
+        prediction = match['response']
+        st.markdown(prediction)
+    else:
+        prediction = st.write_stream(stream_health_risks(food_item, ingredients, consumption_frequency))
+        if cache is not None:
+            cache.add('predict_health_risks', food_item, prediction, context)
+
+    # Extract risk score and health impacts
+    risk_score = 100 - extract_risk_score(prediction)  # Adjusted for higher sentiment being lower risk
+    health_impacts = extract_health_impacts(prediction)
+
+    gauge_slot.plotly_chart(create_risk_gauge(risk_score), use_container_width=True)
+    if health_impacts:
+        radar_slot.plotly_chart(create_health_impact_radar(health_impacts), use_container_width=True)
+    else:
+        radar_slot.warning("No specific health impact ratings were found in the analysis.")
+
 
 
 
@@ -87,35 +144,12 @@ def main():
 
     if analyze_button:
         if food_item and ingredients:
-            st.subheader("📊 Detailed Analysis Results")
-            st.write("---")
-            
-            with st.spinner("Analyzing food safety and health risks..."):
-                prediction = predict_health_risks(food_item, ingredients, consumption_frequency)
-            
-            # Extract risk score and health impacts
-            risk_score = 100 - extract_risk_score(prediction)  # Adjusted for higher sentiment being lower risk
-            health_impacts = extract_health_impacts(prediction)
-
-            # Display graphs side by side
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.plotly_chart(create_risk_gauge(risk_score), use_container_width=True)
-
-            with col2:
-                if health_impacts:
-                    st.plotly_chart(create_health_impact_radar(health_impacts), use_container_width=True)
-                else:
-                    st.warning("No specific health impact ratings were found in the analysis.")
-
-            # Display text analysis
-            st.subheader("📊 Detailed Analysis Results")
-            st.markdown("### 🚨 Health Risk Prediction:")
-            st.markdown(prediction)
-
+            show_health_risks(food_item, ingredients, consumption_frequency)
         else:
             st.warning("⚠️ Please enter both a food item and at least one ingredient.")
+    show_semantic_match_feedback('risk_semantic_match', 'predict_health_risks', food_item,
+                                 semantic_context(ingredients, consumption_frequency),
+                                 lambda: show_health_risks(food_item, ingredients, consumption_frequency, exact=True))
 
     st.sidebar.header("About this App")
     st.sidebar.info(
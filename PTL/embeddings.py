@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", "embedding_index")
+INDEX_CAPACITY = int(os.getenv("EMBEDDING_INDEX_CAPACITY", 100000))
+EMBEDDING_DIM = 1280  # MobileNetV2 GlobalAveragePooling2D output
+N_PLANES = 16
+# Cosine similarity above which two uploads are treated as the same photo
+DUPLICATE_THRESHOLD = 0.97
+# Minimum cosine similarity for an earlier upload to be shown as a similar dish
+SIMILAR_THRESHOLD = float(os.getenv("SIMILAR_DISH_THRESHOLD", 0.75))
+
+
+class EmbeddingIndex:
+    """Approximate nearest-neighbour index over image embeddings, shared by worker processes.
+
+    Vectors are L2-normalised and stored as float16 in a memory-mapped .npy file, next to a
+    random-hyperplane (SimHash) code per row. A search only reranks rows whose code is within
+    one bit of the query's. Rows are append-only; inserts are serialised with a file lock and
+    the row count is published last, so readers never see a half-written row.
+    """
+
+    def __init__(self, path=INDEX_DIR, dim=EMBEDDING_DIM, capacity=INDEX_CAPACITY, n_planes=N_PLANES):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.capacity = capacity
+        self.n_planes = n_planes
+        self.lock = threading.Lock()
+        self.lock_path = os.path.join(path, 'lock')
+        self.meta_path = os.path.join(path, 'metadata.jsonl')
+        with self._write_lock():
+            self.vectors = self._open('vectors.npy', np.float16, (capacity, dim))
+            self.codes = self._open('codes.npy', np.uint32, (capacity,))
+            self.count = self._open('count.npy', np.int64, (1,))
+            if not os.path.exists(self.meta_path):
+                open(self.meta_path, 'a').close()
+        # Same seed in every process so all workers hash into the same buckets
+        self.planes = np.random.RandomState(0).standard_normal((dim, n_planes)).astype(np.float32)
+        self.powers = (1 << np.arange(n_planes)).astype(np.uint32)
+        self.metadata = []
+        self.meta_offset = 0
+
+    def _open(self, name, dtype, shape):
+        file = os.path.join(self.path, name)
+        if os.path.exists(file):
+            array = np.load(file, mmap_mode='r+')
+            if array.shape != shape or array.dtype != dtype:
+                raise ValueError(f"{file} has shape {array.shape} {array.dtype}, expected {shape} {np.dtype(dtype)}")
+            return array
+        return np.lib.format.open_memmap(file, mode='w+', dtype=dtype, shape=shape)
+
+    @contextmanager
+    def _write_lock(self):
+        with self.lock, open(self.lock_path, 'a') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _hash(self, vector):
+        return np.uint32(((vector @ self.planes) > 0).astype(np.uint32) @ self.powers)
+
+    def _load_metadata(self, n):
+        # Only parses lines appended since the last call; a partly written last line is left for next time
+        with self.lock:
+            if len(self.metadata) >= n:
+                return
+            with open(self.meta_path, 'rb') as f:
+                f.seek(self.meta_offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    self.metadata.append(json.loads(line))
+                    self.meta_offset += len(line)
+
+    def __len__(self):
+        return int(self.count[0])
+
+    def add(self, vector, metadata):
+        """Append a vector with JSON-serialisable metadata. Returns its row, or None when full."""
+        vector = self._normalize(vector)
+        with self._write_lock():
+            row = int(self.count[0])
+            if row >= self.capacity:
+                return None
+            self.vectors[row] = vector
+            self.codes[row] = self._hash(vector)
+            with open(self.meta_path, 'a') as f:
+                f.write(json.dumps(metadata) + '\n')
+            self.count[0] = row + 1
+        return row
+
+    def search(self, vector, k=5):
+        """Return up to k (cosine similarity, metadata) pairs, most similar first."""
+        n = len(self)
+        if n == 0:
+            return []
+        vector = self._normalize(vector)
+        code = self._hash(vector)
+        probes = [code] + [code ^ np.uint32(1 << bit) for bit in range(self.n_planes)]
+        candidates = np.flatnonzero(np.isin(self.codes[:n], probes))
+        if len(candidates) < k:
+            # Sparse buckets (e.g. a young index): an exact scan is cheap enough
+            candidates = np.arange(n)
+        similarities = self.vectors[candidates].astype(np.float32) @ vector
+        order = np.argsort(similarities)[::-1][:k]
+        self._load_metadata(n)
+        return [(float(similarities[i]), self.metadata[candidates[i]]) for i in order]
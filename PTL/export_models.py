@@ -0,0 +1,39 @@
+import os
+import sys
+import numpy as np
+from PIL import Image
+from inference import IMG_SIZE, KerasBackend, TFLiteBackend, OnnxBackend, export_tflite, export_onnx, check_parity
+from benchmark import SAMPLE_DIR, SAMPLE_IMAGES
+
+# Usage: python export_models.py
+# Converts food101_mobilenetv2.h5 to TFLite and ONNX and checks both against the Keras model.
+
+
+def load_sample_batch():
+    images = []
+    for name in SAMPLE_IMAGES:
+        img = Image.open(os.path.join(SAMPLE_DIR, name)).convert('RGB').resize((IMG_SIZE, IMG_SIZE))
+        images.append(np.asarray(img, dtype='float32') / 255.0)
+    # Pad with random inputs so the check also covers larger batches
+    noise = np.random.rand(12, IMG_SIZE, IMG_SIZE, 3).astype('float32')
+    return np.concatenate([np.stack(images), noise], axis=0)
+
+
+def main():
+    print(f"Exported {export_tflite()}")
+    print(f"Exported {export_onnx()}")
+
+    reference = KerasBackend()
+    batch = load_sample_batch()
+    failed = False
+    for backend in (TFLiteBackend(), OnnxBackend()):
+        result = check_parity(reference, backend, batch)
+        status = "OK" if result['passed'] else "MISMATCH"
+        print(f"{result['backend']:<8} max abs diff: {result['max_abs_diff']:.2e}   "
+              f"top-1 agreement: {result['top1_agreement']:.2%}   {status}")
+        failed = failed or not result['passed']
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
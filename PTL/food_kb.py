@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import time
+from food_classes import food_classes
+
+# Usage: python food_kb.py build [--output food_kb.json]
+#
+# Generates the Gemini food analysis for every classifier label once, offline, so the Home page
+# can serve them without an LLM round trip. Only free-text foods still go to the model.
+
+KB_PATH = os.getenv("FOOD_KB_PATH", "food_kb.json")
+# Bump whenever FOOD_ANALYSIS_PROMPT or parse_analysis changes; stores built with an older
+# version are ignored until they are rebuilt
+PROMPT_VERSION = 1
+
+FOOD_ANALYSIS_PROMPT = """
+    Food: {food_name}
+    - List the main ingredients in this food item.
+    - For each ingredient, provide a health score from 0 to 10 (0 being very unhealthy, 10 being very healthy).
+    - Finally, provide an overall assessment of whether the food is considered safe or unsafe based on the ingredients.
+    Please structure the response as follows:
+    Ingredients: <ingredient1>|<ingredient2>|<ingredient3>...
+    Health Scores: <score1>|<score2>|<score3>...
+    Overall Food Health: <safe/unsafe>
+    """
+
+
+def parse_analysis(analysis):
+    lines = analysis.split('\n')
+    ingredients = lines[0].split(': ')[1].split('|')
+    health_scores = [int(score) for score in lines[1].split(': ')[1].split('|')]
+    overall_health = lines[2].split(': ')[1]
+    return ingredients, health_scores, overall_health
+
+
+def normalize_food_name(name):
+    return name.strip().lower().replace('-', ' ').replace(' ', '_')
+
+
+def load_food_kb(path=KB_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('prompt_version') != PROMPT_VERSION:
+        return {}
+    return data['foods']
+
+
+def lookup_food(kb, food_name):
+    """Return (ingredients, health_scores, overall_health) for a known class, else None."""
+    entry = kb.get(normalize_food_name(food_name))
+    if entry is None:
+        return None
+    return entry['ingredients'], entry['health_scores'], entry['overall_health']
+
+
+def build_food_kb(generate, path=KB_PATH, retries=3):
+    """Analyse every class with generate(prompt) -> text and write a new version of the store."""
+    foods = {}
+    for name in food_classes:
+        prompt = FOOD_ANALYSIS_PROMPT.format(food_name=name.replace('_', ' '))
+        for attempt in range(retries):
+            try:
+                ingredients, health_scores, overall_health = parse_analysis(generate(prompt))
+                break
+            except Exception as e:
+                if attempt == retries - 1:
+                    raise RuntimeError(f"Could not analyse {name}: {e}") from e
+                time.sleep(2 ** attempt)
+        foods[name] = {
+            'ingredients': [ingredient.strip() for ingredient in ingredients],
+            'health_scores': health_scores,
+            'overall_health': overall_health.strip().lower(),
+        }
+        print(f"{name}: {overall_health.strip()}")
+
+    previous = 0
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            previous = json.load(f).get('version', 0)
+    data = {
+        'version': previous + 1,
+        'prompt_version': PROMPT_VERSION,
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'foods': foods,
+    }
+    # Write then rename so running apps never read a half-written store
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build')
+    build_parser.add_argument('--output', default=KB_PATH)
+    args = parser.parse_args()
+
+    from llm import generate
+    data = build_food_kb(lambda prompt: generate(prompt).strip(), args.output)
+    print(f"Wrote version {data['version']} with {len(data['foods'])} foods to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
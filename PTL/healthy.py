@@ -1,5 +1,4 @@
 import streamlit as st
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import plotly.graph_objects as go
@@ -10,9 +9,6 @@ from io import BytesIO
 # Load environment variables
 load_dotenv()
 
-# Configure the Google Generative AI API with your API key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
 
 # Custom CSS to enhance the app's appearance with dark theme
 st.markdown("""
@@ -1,54 +1,61 @@
 import streamlit as st
 import cv2
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.preprocessing import image
 from PIL import Image
 import io
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import plotly.graph_objects as go
 import requests
+import hashlib
+import time
 from PIL import Image
 from io import BytesIO
+from inference import load_backend
+from batcher import MicroBatcher
+from worker_pool import POOL_WORKERS, WorkerPool
+from lru_cache import LRUCache
+from preprocessing import preprocess_batch
+from embeddings import EmbeddingIndex, DUPLICATE_THRESHOLD, SIMILAR_THRESHOLD
+from live_camera import SESSION_SECONDS, FrameSource, LiveClassifier
+from detection import DETECTOR_WEIGHTS, YoloDetector, detect_and_classify, draw_regions
+from food_classes import food_classes
+from food_kb import FOOD_ANALYSIS_PROMPT, PROMPT_VERSION, load_food_kb, lookup_food, parse_analysis
+from llm import generate
+from semantic_cache import context_key, get_semantic_cache
+from semantic_feedback import note_semantic_match, show_semantic_match_feedback
+from query_log import log_query
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Google Generative AI API with your API key
-api_key=os.getenv("GOOGLE_API_KEY")
-
-# Load the saved MobileNetV2 model
+# Load the MobileNetV2 model on the runtime selected by INFERENCE_BACKEND.
+# Requests from all sessions go through one micro-batcher so concurrent users share forward passes.
+# With INFERENCE_WORKERS set, the model lives in a pool of worker processes instead of this one.
 @st.cache_resource
 def load_model():
-    return tf.keras.models.load_model('food101_mobilenetv2.h5')
+    if POOL_WORKERS:
+        return MicroBatcher(WorkerPool(), concurrency=POOL_WORKERS)
+    return MicroBatcher(load_backend())
 
 model = load_model()
 
-# List of Food-101 classes
-food_classes = [
-    'apple_pie', 'baby_back_ribs', 'baklava', 'beef_carpaccio', 'beef_tartare',
-    'beet_salad', 'beignets', 'bibimbap', 'bread_pudding', 'breakfast_burrito',
-    'bruschetta', 'caesar_salad', 'cannoli', 'caprese_salad', 'carrot_cake',
-    'ceviche', 'cheesecake', 'cheese_plate', 'chicken_curry', 'chicken_quesadilla',
-    'chicken_wings', 'chocolate_cake', 'chocolate_mousse', 'churros', 'clam_chowder',
-    'club_sandwich', 'crab_cakes', 'creme_brulee', 'croque_madame', 'cup_cakes',
-    'deviled_eggs', 'donuts', 'dumplings', 'edamame', 'eggs_benedict', 'escargots',
-    'falafel', 'filet_mignon', 'fish_and_chips', 'foie_gras', 'french_fries',
-    'french_onion_soup', 'french_toast', 'fried_calamari', 'fried_rice', 'frozen_yogurt',
-    'garlic_bread', 'gnocchi', 'greek_salad', 'grilled_cheese_sandwich', 'grilled_salmon',
-    'guacamole', 'gyoza', 'hamburger', 'hot_and_sour_soup', 'hot_dog', 'huevos_rancheros',
-    'hummus', 'ice_cream', 'lasagna', 'lobster_bisque', 'lobster_roll_sandwich',
-    'macaroni_and_cheese', 'macarons', 'miso_soup', 'mussels', 'nachos', 'omelette',
-    'onion_rings', 'oysters', 'pad_thai', 'paella', 'pancakes', 'panna_cotta', 'peking_duck',
-    'pho', 'pizza', 'pork_chop', 'poutine', 'prime_rib', 'pulled_pork_sandwich', 'ramen',
-    'ravioli', 'red_velvet_cake', 'risotto', 'samosa', 'sashimi', 'scallops', 'seaweed_salad',
-    'shrimp_and_grits', 'spaghetti_bolognese', 'spaghetti_carbonara', 'spring_rolls',
-    'steak', 'strawberry_shortcake', 'sushi', 'tacos', 'takoyaki', 'tiramisu', 'tuna_tartare',
-    'waffles'
-]
-IMG_SIZE = 224  # Image size expected by the model
+# Classification results keyed by the SHA-256 of the image bytes, shared by all sessions
+@st.cache_resource
+def classification_cache():
+    return LRUCache(maxsize=512)
+
+# Similar previously-seen dishes, keyed like the classification cache
+@st.cache_resource
+def similar_dishes_cache():
+    return LRUCache(maxsize=512)
+
+# Image embeddings are only available when the Keras model runs in this process
+@st.cache_resource
+def load_embedding_index():
+    if not hasattr(model.backend, 'predict_with_embeddings'):
+        return None
+    return EmbeddingIndex()
 
 # Custom CSS to enhance the app's appearance with dark theme
 st.markdown("""
@@ -96,11 +103,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def preprocess_image(img):
-    img = img.resize((IMG_SIZE, IMG_SIZE))
-    img_array = np.array(img, dtype='float32')
-    img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
-    img_array /= 255.0  # Normalize the image
-    return img_array
+    # Returns a (1, IMG_SIZE, IMG_SIZE, 3) batch normalized to [0, 1]
+    return preprocess_batch([img])
 
 def predict_food(img):
     preprocessed_img = preprocess_image(img)
@@ -110,29 +114,140 @@ def predict_food(img):
     confidence = predictions[0][predicted_class_index]
     return predicted_food_name, confidence
 
+def predict_foods(images, top_k=3):
+    # Stack all images into one batch so the model runs a single forward pass
+    if not images:
+        return []
+    batch = preprocess_batch(images)
+    predictions = model.predict(batch)
+    return top_labels(predictions, top_k)
+
+def top_labels(predictions, top_k=3):
+    top_indices = np.argsort(predictions, axis=1)[:, ::-1][:, :top_k]
+    results = []
+    for row, indices in zip(predictions, top_indices):
+        results.append([(food_classes[i], float(row[i])) for i in indices])
+    return results
+
+def predict_foods_indexed(images, keys, top_k=3):
+    # One forward pass gives both the labels and the embeddings used for similar-dish lookup.
+    # A near-duplicate of an earlier upload reuses that upload's labels so results stay stable.
+    index = load_embedding_index()
+    predictions, embeddings = model.predict_with_embeddings(preprocess_batch(images))
+    results = []
+    for key, top, embedding in zip(keys, top_labels(predictions, top_k), embeddings):
+        neighbours = index.search(embedding, k=6)
+        if neighbours and neighbours[0][0] >= DUPLICATE_THRESHOLD:
+            top = [tuple(label) for label in neighbours[0][1]['top']]
+            neighbours = neighbours[1:]
+        else:
+            index.add(embedding, {'top': top})
+        similar_dishes_cache().put(key, [(similarity, meta['top'][0][0]) for similarity, meta in neighbours[:5]
+                                         if similarity >= SIMILAR_THRESHOLD])
+        results.append(top)
+    return results
+
+def session_classification_cache():
+    if 'classification_cache' not in st.session_state:
+        st.session_state.classification_cache = LRUCache(maxsize=32)
+    return st.session_state.classification_cache
+
+def classify_uploads(files, top_k=3):
+    # Reruns on an image we've already seen skip both decoding and inference
+    session_cache = session_classification_cache()
+    global_cache = classification_cache()
+    keys = [f"{hashlib.sha256(f.getvalue()).hexdigest()}:{top_k}" for f in files]
+    results = []
+    for key in keys:
+        result = session_cache.get(key)
+        if result is None:
+            result = global_cache.get(key)
+            if result is not None:
+                session_cache.put(key, result)
+        results.append(result)
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        images = [files[i].getvalue() for i in misses]
+        if load_embedding_index() is not None:
+            predicted = predict_foods_indexed(images, [keys[i] for i in misses], top_k=top_k)
+        else:
+            predicted = predict_foods(images, top_k=top_k)
+        for i, result in zip(misses, predicted):
+            global_cache.put(keys[i], result)
+            session_cache.put(keys[i], result)
+            results[i] = result
+    return results
+
+def classify_frame(batch):
+    label, confidence = top_labels(model.predict(batch), top_k=1)[0][0]
+    return label, confidence
+
+def run_live_classification(frame_slot, max_seconds=SESSION_SECONDS):
+    # Opens the camera attached to the machine running the app (e.g. a kiosk).
+    # Streamlit stops this loop by raising into it on the next rerun, which closes the camera;
+    # otherwise it ends after max_seconds so an abandoned session doesn't hold the camera.
+    live = LiveClassifier(FrameSource(), classify_frame)
+    stop_at = time.monotonic() + max_seconds
+    try:
+        while time.monotonic() < stop_at:
+            frame = live.step()
+            if frame is None:
+                time.sleep(0.005)
+                continue
+            frame_slot.image(frame, channels="BGR", use_column_width=True)
+    finally:
+        live.close()
+
+# Region detector for multi-dish plates; only available when DETECTOR_WEIGHTS is configured
+@st.cache_resource
+def load_detector():
+    if not DETECTOR_WEIGHTS:
+        return None
+    return YoloDetector()
+
+def show_plate_regions(file):
+    detector = load_detector()
+    if detector is None:
+        st.info("No region detector configured. Set DETECTOR_WEIGHTS to enable multi-dish plates.")
+        return
+    with st.spinner("Finding dishes on the plate..."):
+        regions = detect_and_classify(file.getvalue(), detector, model.predict, food_classes)
+    st.image(draw_regions(file.getvalue(), regions), caption='Detected dishes.', use_column_width=True)
+    for region in regions:
+        st.write(f"- {region['label']} ({region['confidence']:.2f})")
+
+def show_similar_dishes(file, top_k=3):
+    key = f"{hashlib.sha256(file.getvalue()).hexdigest()}:{top_k}"
+    similar = similar_dishes_cache().get(key)
+    if similar:
+        st.caption("Similar dishes: " + " | ".join(f"{label} ({similarity:.2f})" for similarity, label in similar))
+
 def analyze_food(food_name):
-    prompt = f"""
-    Food: {food_name}
-    - List the main ingredients in this food item.
-    - For each ingredient, provide a health score from 0 to 10 (0 being very unhealthy, 10 being very healthy).
-    - Finally, provide an overall assessment of whether the food is considered safe or unsafe based on the ingredients.
-    Please structure the response as follows:
-    Ingredients: <ingredient1>|<ingredient2>|<ingredient3>...
-    Health Scores: <score1>|<score2>|<score3>...
-    Overall Food Health: <safe/unsafe>
-    """
-
-    model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content(prompt)
-    output = response.text.strip()
+    prompt = FOOD_ANALYSIS_PROMPT.format(food_name=food_name)
+    output = generate(prompt, endpoint='analyze_food', prompt_version=PROMPT_VERSION,
+                      validate=lambda text: parse_analysis(text.strip())).strip()
     return output
 
-def parse_analysis(analysis):
-    lines = analysis.split('\n')
-    ingredients = lines[0].split(': ')[1].split('|')
-    health_scores = [int(score) for score in lines[1].split(': ')[1].split('|')]
-    overall_health = lines[2].split(': ')[1]
-    return ingredients, health_scores, overall_health
+# Free-text foods close to one analysed before ("pizza slice", "cheese pizza") reuse its analysis.
+# Answers are tied to the prompt template, so changing it starts a fresh set.
+SEMANTIC_CONTEXT = context_key(FOOD_ANALYSIS_PROMPT, PROMPT_VERSION)
+
+def lookup_similar_analysis(food_name):
+    cache = get_semantic_cache()
+    if cache is None:
+        return None
+    return cache.lookup('analyze_food', food_name, SEMANTIC_CONTEXT)
+
+def remember_analysis(food_name, analysis):
+    cache = get_semantic_cache()
+    if cache is not None:
+        cache.add('analyze_food', food_name, analysis, SEMANTIC_CONTEXT)
+
+# Precomputed analyses for the 101 classifier labels, built offline by food_kb.py
+@st.cache_resource
+def load_knowledge_base():
+    return load_food_kb()
 
 def create_health_chart(ingredients, health_scores):
     colors = ['#EF4444' if score < 4 else '#F59E0B' if score < 7 else '#10B981' for score in health_scores]
@@ -193,13 +308,25 @@ def get_health_category(score):
     else:
         return "Unhealthy", "#EF4444"
 
-def display_food_analysis(food_name):
+def display_food_analysis(food_name, exact=False):
     st.subheader(f"Analyzing: {food_name}")
+    if not exact:
+        log_query('analyze_food', food_name=food_name)
     
     with st.spinner("Analyzing food safety and health risks..."):
         try:
-            analysis = analyze_food(food_name)
-            ingredients, health_scores, overall_health = parse_analysis(analysis)
+            # Known classes are served from the local store; only free-text foods go to the LLM
+            known = lookup_food(load_knowledge_base(), food_name)
+            match = None if known or exact else lookup_similar_analysis(food_name)
+            note_semantic_match('food_semantic_match', food_name, match, SEMANTIC_CONTEXT)
+            if known:
+                ingredients, health_scores, overall_health = known
+            elif match:
+                ingredients, health_scores, overall_health = parse_analysis(match['response'])
+            else:
+                analysis = analyze_food(food_name)
+                ingredients, health_scores, overall_health = parse_analysis(analysis)
+                remember_analysis(food_name, analysis)
 
             col1, col2 = st.columns([1, 2])
 
@@ -243,7 +370,8 @@ def main():
     st.title("🍽️ Food Image Classifier and Health Analyzer")
     st.write("Upload an image, use your webcam to classify food, or enter a food name for analysis!")
 
-    tab1, tab2 = st.tabs(["🖼️ Image Classification", "✍️ Manual Entry"])
+    tab1, tab2, tab3, tab4 = st.tabs(["🖼️ Image Classification", "✍️ Manual Entry", "📚 Batch Classification",
+                                      "🎥 Live Camera"])
 
     with tab1:
         st.header("Image Classification")
@@ -251,13 +379,15 @@ def main():
         uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"])
 
         if uploaded_file is not None:
-            image = Image.open(uploaded_file)
-            st.image(image, caption='Uploaded Image.', use_column_width=True)
+            st.image(uploaded_file, caption='Uploaded Image.', use_column_width=True)
             st.write("")
             with st.spinner("Classifying..."):
-                label, confidence = predict_food(image)
+                label, confidence = classify_uploads([uploaded_file])[0][0]
             st.success(f"Prediction: {label}")
             st.info(f"Confidence: {confidence:.2f}")
+            show_similar_dishes(uploaded_file)
+            if st.checkbox("This plate has several dishes", key="multi_dish"):
+                show_plate_regions(uploaded_file)
             
             if st.button("Analyze This Food", key="analyze_uploaded"):
                 display_food_analysis(label)
@@ -266,13 +396,13 @@ def main():
         st.subheader("Or use your webcam:")
         picture = st.camera_input("Take a picture")
         if picture:
-            image = Image.open(picture)
-            st.image(image, caption='Captured Image.', use_column_width=True)
+            st.image(picture, caption='Captured Image.', use_column_width=True)
             st.write("")
             with st.spinner("Classifying..."):
-                label, confidence = predict_food(image)
+                label, confidence = classify_uploads([picture])[0][0]
             st.success(f"Prediction: {label}")
             st.info(f"Confidence: {confidence:.2f}")
+            show_similar_dishes(picture)
             
             if st.button("Analyze This Food", key="analyze_webcam"):
                 display_food_analysis(label)
@@ -294,9 +424,42 @@ def main():
                 display_food_analysis(food_name)
             else:
                 st.warning("Please enter a food item to analyze.")
+        show_semantic_match_feedback('food_semantic_match', 'analyze_food', food_name, SEMANTIC_CONTEXT,
+                                     lambda: display_food_analysis(food_name, exact=True))
+
+    with tab3:
+        st.header("Batch Classification")
+        uploaded_files = st.file_uploader("Choose several images...", type=["jpg", "jpeg", "png"],
+                                          accept_multiple_files=True, key="batch_uploader")
+
+        if uploaded_files:
+            with st.spinner(f"Classifying {len(uploaded_files)} images..."):
+                results = classify_uploads(uploaded_files)
+
+            cols = st.columns(3)
+            for i, (uploaded, top) in enumerate(zip(uploaded_files, results)):
+                with cols[i % 3]:
+                    st.image(uploaded, caption=uploaded.name, use_column_width=True)
+                    label, confidence = top[0]
+                    st.success(f"Prediction: {label}")
+                    st.caption(" | ".join(f"{name}: {conf:.2f}" for name, conf in top))
+
+    with tab4:
+        st.header("Live Classification")
+        st.write("Classifies the camera feed continuously; the model only runs when the scene changes.")
+        live_slot = st.empty() if st.checkbox("Start live camera", key="live_camera") else None
 
     st.markdown("---")
     st.write("Thank you for using the Food Image Classifier and Health Analyzer!")
 
+    # The live loop blocks until the session ends, so it starts only once the rest of the page is out
+    if live_slot is not None:
+        try:
+            run_live_classification(live_slot)
+        except RuntimeError as e:
+            live_slot.error(str(e))
+        else:
+            live_slot.info("Live session ended; untick and tick \"Start live camera\" to resume.")
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
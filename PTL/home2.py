@@ -1,55 +1,28 @@
 import streamlit as st
 import cv2
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.preprocessing import image
 from PIL import Image
 import io
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import plotly.graph_objects as go
 import requests
 from PIL import Image
 from io import BytesIO
+from inference import IMG_SIZE, load_backend
+from food_classes import food_classes
+from llm import generate
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Google Generative AI API with your API key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-# Load the saved MobileNetV2 model
+# Load the MobileNetV2 model on the runtime selected by INFERENCE_BACKEND
 @st.cache_resource
 def load_model():
-    return tf.keras.models.load_model('food101_mobilenetv2.h5')
+    return load_backend()
 
 model = load_model()
 
-# List of Food-101 classes
-food_classes = [
-    'apple_pie', 'baby_back_ribs', 'baklava', 'beef_carpaccio', 'beef_tartare',
-    'beet_salad', 'beignets', 'bibimbap', 'bread_pudding', 'breakfast_burrito',
-    'bruschetta', 'caesar_salad', 'cannoli', 'caprese_salad', 'carrot_cake',
-    'ceviche', 'cheesecake', 'cheese_plate', 'chicken_curry', 'chicken_quesadilla',
-    'chicken_wings', 'chocolate_cake', 'chocolate_mousse', 'churros', 'clam_chowder',
-    'club_sandwich', 'crab_cakes', 'creme_brulee', 'croque_madame', 'cup_cakes',
-    'deviled_eggs', 'donuts', 'dumplings', 'edamame', 'eggs_benedict', 'escargots',
-    'falafel', 'filet_mignon', 'fish_and_chips', 'foie_gras', 'french_fries',
-    'french_onion_soup', 'french_toast', 'fried_calamari', 'fried_rice', 'frozen_yogurt',
-    'garlic_bread', 'gnocchi', 'greek_salad', 'grilled_cheese_sandwich', 'grilled_salmon',
-    'guacamole', 'gyoza', 'hamburger', 'hot_and_sour_soup', 'hot_dog', 'huevos_rancheros',
-    'hummus', 'ice_cream', 'lasagna', 'lobster_bisque', 'lobster_roll_sandwich',
-    'macaroni_and_cheese', 'macarons', 'miso_soup', 'mussels', 'nachos', 'omelette',
-    'onion_rings', 'oysters', 'pad_thai', 'paella', 'pancakes', 'panna_cotta', 'peking_duck',
-    'pho', 'pizza', 'pork_chop', 'poutine', 'prime_rib', 'pulled_pork_sandwich', 'ramen',
-    'ravioli', 'red_velvet_cake', 'risotto', 'samosa', 'sashimi', 'scallops', 'seaweed_salad',
-    'shrimp_and_grits', 'spaghetti_bolognese', 'spaghetti_carbonara', 'spring_rolls',
-    'steak', 'strawberry_shortcake', 'sushi', 'tacos', 'takoyaki', 'tiramisu', 'tuna_tartare',
-    'waffles'
-]
-IMG_SIZE = 224  # Image size expected by the model
-
 # Custom CSS to enhance the app's appearance with dark theme
 st.markdown("""
 <style>
@@ -107,9 +80,7 @@ def analyze_food(food_name):
     Overall Food Health: <safe/unsafe>
     """
 
-    model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content(prompt)
-    output = response.text.strip()
+    output = generate(prompt, endpoint='analyze_food', validate=lambda text: parse_analysis(text.strip())).strip()
     return output
 
 def parse_analysis(analysis):
@@ -0,0 +1,188 @@
+import os
+import threading
+import numpy as np
+
+MODEL_PATH = 'food101_mobilenetv2.h5'
+TFLITE_PATH = 'food101_mobilenetv2.tflite'
+ONNX_PATH = 'food101_mobilenetv2.onnx'
+ARTIFACT_DIR = 'food101_mobilenetv2_artifact'
+IMG_SIZE = 224  # Image size expected by the model
+
+# Runtime used to execute the classifier: keras, keras-mmap, tflite or onnx
+BACKEND = os.getenv("INFERENCE_BACKEND", "keras")
+NUM_THREADS = int(os.getenv("INFERENCE_THREADS", os.cpu_count() or 1))
+# Run TFLite on its builtin kernels, which read weights straight from the shared file mapping
+TFLITE_SHARE_WEIGHTS = os.getenv("TFLITE_SHARE_WEIGHTS", "0") == "1"
+
+
+def compile_inference_fn(model):
+    """Wrap a Keras model in a graph-compiled function with a fixed input signature.
+
+    model.predict builds a data adapter, callbacks and a progress bar on every call,
+    which costs more than the forward pass itself for a single image.
+    """
+    import tensorflow as tf
+
+    @tf.function(input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 3], tf.float32)])
+    def infer(batch):
+        return model(batch, training=False)
+
+    # Warm-up pass so the first user request doesn't pay for tracing and kernel setup
+    infer(tf.zeros((1, IMG_SIZE, IMG_SIZE, 3), dtype=tf.float32))
+    return infer
+
+
+def compile_embedding_fn(model):
+    """Like compile_inference_fn, but also returns the GlobalAveragePooling2D features.
+
+    Both outputs come from the same forward pass, so embeddings cost nothing extra.
+    """
+    import tensorflow as tf
+    pooling = next(layer for layer in model.layers if isinstance(layer, tf.keras.layers.GlobalAveragePooling2D))
+    feature_model = tf.keras.Model(model.inputs, [model.outputs[0], pooling.output])
+
+    @tf.function(input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 3], tf.float32)])
+    def infer(batch):
+        return feature_model(batch, training=False)
+
+    infer(tf.zeros((1, IMG_SIZE, IMG_SIZE, 3), dtype=tf.float32))
+    return infer
+
+
+def run_inference(infer, batch):
+    import tensorflow as tf
+    return infer(tf.convert_to_tensor(batch, dtype=tf.float32)).numpy()
+
+
+class KerasBackend:
+    name = 'keras'
+
+    def __init__(self, model_path=MODEL_PATH, num_threads=NUM_THREADS):
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        self.model = tf.keras.models.load_model(model_path)
+        self.infer = compile_inference_fn(self.model)
+        # Traced and warmed here too, so the first upload doesn't pay for it on a scheduler thread
+        self.embed_infer = compile_embedding_fn(self.model)
+
+    def predict(self, batch):
+        return run_inference(self.infer, batch)
+
+    def predict_with_embeddings(self, batch):
+        import tensorflow as tf
+        predictions, embeddings = self.embed_infer(tf.convert_to_tensor(batch, dtype=tf.float32))
+        return predictions.numpy(), embeddings.numpy()
+
+
+class KerasMmapBackend(KerasBackend):
+    """Keras model rebuilt from a model_artifact.py export instead of the .h5.
+
+    The weights file is memory-mapped read-only, which skips HDF5 parsing on start.
+    """
+    name = 'keras-mmap'
+
+    def __init__(self, model_path=ARTIFACT_DIR, num_threads=NUM_THREADS):
+        import tensorflow as tf
+        from model_artifact import load_artifact
+        tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        self.model = load_artifact(model_path)
+        self.infer = compile_inference_fn(self.model)
+        self.embed_infer = compile_embedding_fn(self.model)
+
+
+class TFLiteBackend:
+    name = 'tflite'
+
+    def __init__(self, model_path=TFLITE_PATH, num_threads=NUM_THREADS, share_weights=TFLITE_SHARE_WEIGHTS):
+        # Prefer the standalone runtime so workers don't need to import TensorFlow at all
+        try:
+            from tflite_runtime.interpreter import Interpreter, OpResolverType
+        except ImportError:
+            from tensorflow.lite import Interpreter
+            from tensorflow.lite.experimental import OpResolverType
+        # The flatbuffer at model_path is memory-mapped, so every process on the host shares its
+        # pages. XNNPACK (on by default for float models) repacks weights into private memory;
+        # share_weights skips it and trades some speed for one copy of the weights per host.
+        resolver = OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES if share_weights else OpResolverType.AUTO
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads,
+                                       experimental_op_resolver_type=resolver)
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = None
+        # The interpreter holds mutable tensors, so calls must not overlap
+        self.lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self.lock:
+            if batch.shape[0] != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self.batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self.input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, model_path=ONNX_PATH, num_threads=NUM_THREADS):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'keras-mmap': KerasMmapBackend,
+    'tflite': TFLiteBackend,
+    'onnx': OnnxBackend,
+}
+
+
+def load_backend(name=BACKEND, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+def export_tflite(model_path=MODEL_PATH, output_path=TFLITE_PATH):
+    """Convert the Keras .h5 model into a float32 TFLite flatbuffer."""
+    import tensorflow as tf
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def export_onnx(model_path=MODEL_PATH, output_path=ONNX_PATH, opset=13):
+    """Convert the Keras .h5 model into an ONNX graph with a dynamic batch dimension."""
+    import tensorflow as tf
+    import tf2onnx
+    model = tf.keras.models.load_model(model_path)
+    signature = (tf.TensorSpec((None, IMG_SIZE, IMG_SIZE, 3), tf.float32, name='input'),)
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=output_path)
+    return output_path
+
+
+def check_parity(reference, candidate, batch, atol=1e-3):
+    """Compare a candidate backend's outputs with the reference backend on the same batch."""
+    expected = reference.predict(batch)
+    actual = candidate.predict(batch)
+    max_abs_diff = float(np.max(np.abs(expected - actual)))
+    top1_agreement = float(np.mean(np.argmax(expected, axis=1) == np.argmax(actual, axis=1)))
+    return {
+        'backend': candidate.name,
+        'max_abs_diff': max_abs_diff,
+        'top1_agreement': top1_agreement,
+        'passed': max_abs_diff <= atol and top1_agreement == 1.0,
+    }
@@ -1,17 +1,45 @@
 import streamlit as st
-import google.generativeai as genai
 import os
+import re
+import json
 from dotenv import load_dotenv
 import plotly.graph_objects as go
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm import generate
+from token_budget import WORDS_PER_TOKEN, items_per_request, length_hint
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Ingredients analysed in parallel; the shared LLM rate limit still applies on top of this
+MAX_CONCURRENCY = int(os.getenv("INGREDIENT_CONCURRENCY", 6))
+# Single-request mode: words each ingredient's answer may use, and the tokens that takes once
+# wrapped in its JSON object. Requests hold no more ingredients than the endpoint's output cap
+# has room for, and the prompt-size cap (~4 characters per token) keeps long lists well under
+# the model's input limit.
+BATCH_ITEM_WORDS = 60
+BATCH_ITEM_TOKENS = int(BATCH_ITEM_WORDS / WORDS_PER_TOKEN) + 30
+BATCH_MAX_ITEMS = min(int(os.getenv("INGREDIENT_BATCH_SIZE", 15)),
+                      items_per_request('assess_ingredients_batch', BATCH_ITEM_TOKENS))
+BATCH_MAX_CHARS = 6000
+
+BATCH_PROMPT = """
+    As a food safety and health expert, analyze each of the following ingredients and their quantities:
+
+    {items}
+
+    Respond with only a JSON array containing one object per ingredient, with these fields:
+    - "id": the number in front of the ingredient
+    - "safe": true if the quantity is safe for consumption, otherwise false
+    - "health_risks": potential health risks if this quantity is regularly consumed
+    - "safe_limits": safe limits for this ingredient and recommended adjustments if needed
+
+    Keep "health_risks" and "safe_limits" under {item_words} words together for each ingredient.
+    """
 
-def assess_ingredient_safety(ingredient, quantity):
-    prompt = f"""
+
+def ingredient_safety_prompt(ingredient, quantity):
+    return f"""
     As a food safety and health expert, analyze the following ingredient and its quantity:
 
     Ingredient: {ingredient}
@@ -21,17 +49,116 @@ def assess_ingredient_safety(ingredient, quantity):
     1. Whether the quantity is safe for consumption.
     2. Potential health risks if this quantity is regularly consumed.
     3. Safe limits for this ingredient and recommended adjustments if needed.
+
+    {length_hint('assess_ingredient_safety')}
     """
-    model = genai.GenerativeModel('gemini-pro')
-    response = model.generate_content(prompt)
-    return response.text
 
-def predict_health_risks(ingredients_with_quantities):
-    analysis = []
-    for ingredient, quantity in ingredients_with_quantities:
-        safety_analysis = assess_ingredient_safety(ingredient, quantity)
-        analysis.append({"ingredient": ingredient, "quantity": quantity, "analysis": safety_analysis})
-    return analysis
+def assess_ingredient_safety(ingredient, quantity):
+    return generate(ingredient_safety_prompt(ingredient, quantity), endpoint='assess_ingredient_safety')
+
+def iter_health_risks(ingredients_with_quantities):
+    # Yields each ingredient's analysis as soon as its LLM call finishes, in completion order.
+    # If the consumer stops early (a Streamlit rerun closes the generator), queued calls are
+    # cancelled instead of waited on.
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY)
+    try:
+        futures = {
+            executor.submit(assess_ingredient_safety, ingredient, quantity): (ingredient, quantity)
+            for ingredient, quantity in ingredients_with_quantities
+        }
+        for future in as_completed(futures):
+            ingredient, quantity = futures[future]
+            yield {"ingredient": ingredient, "quantity": quantity, "analysis": future.result()}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def chunk_ingredients(ingredients_with_quantities, max_items=BATCH_MAX_ITEMS, max_chars=BATCH_MAX_CHARS):
+    # Chunks hold (position, ingredient, quantity); position is the entry's index in session_state
+    chunks, current, size = [], [], 0
+    for i, (ingredient, quantity) in enumerate(ingredients_with_quantities):
+        line_size = len(f"{i}. {ingredient}: {quantity}") + 1
+        if current and (len(current) >= max_items or size + line_size > max_chars):
+            chunks.append(current)
+            current, size = [], 0
+        current.append((i, ingredient, quantity))
+        size += line_size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def parse_batch_response(text):
+    # The model sometimes wraps the array in a ```json fence or adds a sentence around it
+    match = re.search(r'\[.*\]', text, re.S)
+    if not match:
+        raise ValueError("No JSON array in response")
+    return json.loads(match.group(0))
+
+def parse_batch_entries(text):
+    # Like parse_batch_response, but keeps the complete objects of an array that was cut off
+    # at the output cap, or that breaks down partway
+    start = text.find('[')
+    if start < 0:
+        return []
+    decoder = json.JSONDecoder()
+    entries, pos = [], start + 1
+    while True:
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(text) or text[pos] == ']':
+            return entries
+        try:
+            entry, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return entries
+        entries.append(entry)
+
+def format_assessment(entry):
+    # Only a real JSON boolean counts; "false" as a string would otherwise read as safe
+    if not isinstance(entry.get('safe'), bool):
+        raise ValueError(f"Invalid 'safe' value: {entry.get('safe')!r}")
+    verdict = "✅ Safe in this quantity" if entry['safe'] else "⚠️ Not safe in this quantity"
+    return (f"**{verdict}**\n\n"
+            f"**Potential health risks:** {entry.get('health_risks', '')}\n\n"
+            f"**Safe limits:** {entry.get('safe_limits', '')}")
+
+def assess_ingredients_chunk(chunk):
+    """Assessments by position for the chunk's ingredients the model answered properly."""
+    items = "\n    ".join(f"{i}. {ingredient}: {quantity}" for i, ingredient, quantity in chunk)
+    prompt = BATCH_PROMPT.format(items=items, item_words=BATCH_ITEM_WORDS)
+    text = generate(prompt, endpoint='assess_ingredients_batch', validate=parse_batch_response)
+    positions = {i for i, _, _ in chunk}
+    assessments = {}
+    # Entries are checked one by one so a single malformed one only sends that ingredient to the fallback
+    for entry in parse_batch_entries(text):
+        try:
+            i = int(entry['id'])
+            if i in positions:
+                assessments[i] = format_assessment(entry)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+    return assessments
+
+def iter_health_risks_batched(ingredients_with_quantities):
+    # One structured request per chunk instead of one per ingredient; chunks still run in parallel.
+    # Anything the model dropped or mangled goes to the per-ingredient prompt on the same pool.
+    chunks = chunk_ingredients(ingredients_with_quantities)
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY)
+    try:
+        futures = {executor.submit(assess_ingredients_chunk, chunk): chunk for chunk in chunks}
+        fallbacks = {}
+        for future in as_completed(futures):
+            assessments = future.result()
+            for i, safety_analysis in sorted(assessments.items()):
+                ingredient, quantity = ingredients_with_quantities[i]
+                yield {"ingredient": ingredient, "quantity": quantity, "analysis": safety_analysis}
+            for i, ingredient, quantity in futures[future]:
+                if i not in assessments:
+                    fallbacks[executor.submit(assess_ingredient_safety, ingredient, quantity)] = i
+        for future in as_completed(fallbacks):
+            ingredient, quantity = ingredients_with_quantities[fallbacks[future]]
+            yield {"ingredient": ingredient, "quantity": quantity, "analysis": future.result()}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 def create_safety_chart(analysis):
     ingredients = [item['ingredient'] for item in analysis]
@@ -79,17 +206,21 @@ def main():
         for ing, qty in zip(st.session_state.ingredients, st.session_state.quantities):
             st.write(f"- {ing}: {qty}")
 
+    single_request = st.checkbox("Analyze all ingredients in a single request")
+
     # Analyze all ingredients
     if st.button("Analyze All"):
         if food_item and st.session_state.ingredients:
             ingredients_with_quantities = list(zip(st.session_state.ingredients, st.session_state.quantities))
             st.info("Analyzing ingredient quantities and health impacts...")
-            analysis = predict_health_risks(ingredients_with_quantities)
 
             st.subheader("🔍 Health and Safety Assessment:")
-            for item in analysis:
+            analysis = []
+            results = iter_health_risks_batched if single_request else iter_health_risks
+            for item in results(ingredients_with_quantities):
                 with st.expander(f"{item['ingredient']} ({item['quantity']})"):
                     st.write(item['analysis'])
+                analysis.append(item)
 
             st.subheader("📊 Safety Analysis Chart")
             safety_chart = create_safety_chart(analysis)
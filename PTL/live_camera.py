@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from inference import IMG_SIZE
+from preprocessing import SCALE
+
+CAMERA_DEVICE = int(os.getenv("LIVE_CAMERA_DEVICE", 0))
+# Mean absolute difference (0-255) on a small grayscale thumbnail that counts as a new scene
+CHANGE_THRESHOLD = float(os.getenv("LIVE_CHANGE_THRESHOLD", 12))
+# How long one live session runs before the camera is released and the user has to restart it
+SESSION_SECONDS = float(os.getenv("LIVE_SESSION_SECONDS", 300))
+
+
+class FrameSource:
+    """Read frames from an OpenCV capture device on a background thread.
+
+    Only the newest frame is kept, so a slow consumer always sees the current scene instead of
+    working through a backlog of stale frames.
+    """
+
+    def __init__(self, device=CAMERA_DEVICE):
+        self.capture = cv2.VideoCapture(device)
+        if not self.capture.isOpened():
+            raise RuntimeError("Could not open video stream.")
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.lock = threading.Lock()
+        self.frame = None
+        self.frame_id = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="frame-source", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            ok, frame = self.capture.read()
+            if not ok:
+                time.sleep(0.01)
+                continue
+            with self.lock:
+                self.frame = frame
+                self.frame_id += 1
+
+    def read(self):
+        with self.lock:
+            return self.frame_id, self.frame
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=1)
+        self.capture.release()
+
+
+class ChangeDetector:
+    """Decide whether a frame differs enough from the last classified one to be worth classifying."""
+
+    def __init__(self, threshold=CHANGE_THRESHOLD, size=64):
+        self.threshold = threshold
+        self.size = size
+        self.reference = None
+
+    def changed(self, frame):
+        small = cv2.resize(frame, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+        # Compare with the last classified frame so slow drift still triggers eventually
+        if self.reference is None or np.mean(np.abs(gray - self.reference)) > self.threshold:
+            self.reference = gray
+            return True
+        return False
+
+
+def preprocess_frame(frame):
+    # BGR camera frame -> (1, IMG_SIZE, IMG_SIZE, 3) RGB batch in [0, 1]
+    rgb = cv2.cvtColor(cv2.resize(frame, (IMG_SIZE, IMG_SIZE), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+    batch = np.empty((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    np.multiply(rgb, SCALE, out=batch[0], casting='unsafe')
+    return batch
+
+
+class LiveClassifier:
+    """Classify a live camera feed, running the model only when the scene changes.
+
+    classify takes a preprocessed (1, IMG_SIZE, IMG_SIZE, 3) batch and returns (label, confidence).
+    """
+
+    def __init__(self, source, classify, detector=None):
+        self.source = source
+        self.classify = classify
+        self.detector = detector or ChangeDetector()
+        self.last_frame_id = 0
+        self.last_frame_time = None
+        self.fps = 0.0
+        self.label = None
+        self.confidence = 0.0
+        self.latency_ms = 0.0
+        self.inferences = 0
+
+    def step(self):
+        """Process the newest frame. Returns it annotated, or None if no new frame has arrived."""
+        frame_id, frame = self.source.read()
+        if frame is None or frame_id == self.last_frame_id:
+            return None
+        self.last_frame_id = frame_id
+
+        now = time.perf_counter()
+        if self.last_frame_time is not None:
+            # Smoothed so the overlay doesn't flicker
+            self.fps = 0.9 * self.fps + 0.1 / max(now - self.last_frame_time, 1e-6)
+        self.last_frame_time = now
+
+        if self.detector.changed(frame):
+            start = time.perf_counter()
+            self.label, self.confidence = self.classify(preprocess_frame(frame))
+            self.latency_ms = (time.perf_counter() - start) * 1000
+            self.inferences += 1
+        return self.annotate(frame.copy())
+
+    def annotate(self, frame):
+        if self.label is not None:
+            cv2.putText(frame, f'Predicted: {self.label} ({self.confidence:.2f})', (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2, cv2.LINE_AA)
+        cv2.putText(frame, f'FPS: {self.fps:.1f}  Inference: {self.latency_ms:.0f} ms', (10, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+        return frame
+
+    def close(self):
+        self.source.close()
@@ -0,0 +1,278 @@
+import os
+import random
+import threading
+import time
+import warnings
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from dotenv import load_dotenv
+from llm_cache import CACHE_ENABLED, LLMCache, cache_key
+from llm_metrics import METRICS_PORT, LLMMetrics, serve_metrics, usage_tokens
+from single_flight import SingleFlight
+from token_budget import apply_budget
+
+# Process-wide Gemini client. Every page goes through generate() so timeouts, retries and
+# model instances are configured in one place.
+
+load_dotenv()
+
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-pro")
+# Deadline for a single request, and for the whole call including retries (seconds)
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 30))
+TOTAL_TIMEOUT = float(os.getenv("LLM_TOTAL_TIMEOUT", 60))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# Requests per second allowed for the configured API key, with short bursts up to RATE_BURST
+RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", 5))
+RATE_BURST = int(os.getenv("LLM_RATE_BURST", 10))
+
+# Errors worth retrying: throttling, server-side failures and timeouts
+TRANSIENT_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    TimeoutError,
+    ConnectionError,
+)
+
+_lock = threading.Lock()
+_configured = False
+_models = {}
+_cache = None
+# Identical calls already in flight are joined instead of being sent again
+_in_flight = SingleFlight()
+_metrics = LLMMetrics()
+
+
+class LLMError(Exception):
+    pass
+
+
+class RateLimiter:
+    """Token bucket shared by every thread in the process."""
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take one token, waiting up to timeout seconds. Returns False if none became available."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+_rate_limiter = RateLimiter()
+
+
+def _configure():
+    global _configured
+    if not _configured:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY"))
+        _configured = True
+
+
+def get_model(model_name=MODEL_NAME):
+    """Return the shared GenerativeModel instance for model_name, creating it on first use."""
+    with _lock:
+        if model_name not in _models:
+            _configure()
+            _models[model_name] = genai.GenerativeModel(model_name)
+        return _models[model_name]
+
+
+def get_cache():
+    global _cache
+    with _lock:
+        if _cache is None and CACHE_ENABLED:
+            _cache = LLMCache()
+        return _cache
+
+
+def backoff_delay(attempt):
+    # "Full jitter": spreads retries from many sessions instead of having them retry in lockstep
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def flight_key(prompt, model_name, prompt_version, kwargs):
+    return cache_key(prompt, model_name, prompt_version), repr(sorted(kwargs.items()))
+
+
+def cacheable(text, validate):
+    """Whether text may be cached: validate(text) is the caller's parser and must not raise."""
+    if validate is None:
+        return True
+    try:
+        validate(text)
+    except Exception:
+        return False
+    return True
+
+
+def generate(prompt, endpoint=None, prompt_version=1, model_name=MODEL_NAME, validate=None, **kwargs):
+    """Generate text for prompt.
+
+    Calls that name their endpoint are served from and stored in the shared response cache;
+    bump prompt_version when that endpoint's prompt template changes. Pass the caller's parser
+    as validate so a response it can't read is returned but not cached. Concurrent calls with
+    the same prompt share one request. The endpoint's generation config from token_budget
+    applies unless the caller passes its own.
+    """
+    kwargs = apply_budget(endpoint, kwargs)
+    cache = get_cache() if endpoint else None
+    if cache is not None:
+        cached = cache.get(endpoint, prompt, model_name, prompt_version)
+        if cached is not None:
+            _metrics.record_cache_hit(endpoint)
+            return cached
+
+    def call():
+        text = generate_uncached(prompt, model_name, endpoint=endpoint, **kwargs)
+        if cache is not None and cacheable(text, validate):
+            cache.set(endpoint, prompt, model_name, text, prompt_version)
+        return text
+
+    return _in_flight.do(flight_key(prompt, model_name, prompt_version, kwargs), call)
+
+
+def generate_stream(prompt, endpoint=None, prompt_version=1, model_name=MODEL_NAME, validate=None, **kwargs):
+    """Yield the response text in chunks as Gemini produces it.
+
+    Uses the same cache as generate(): a hit is yielded as a single chunk, and a miss is
+    stored once the stream has finished and validate accepts it. A caller asking for a stream that is already in
+    flight replays the chunks received so far and then follows it.
+    """
+    kwargs = apply_budget(endpoint, kwargs)
+    cache = get_cache() if endpoint else None
+    if cache is not None:
+        cached = cache.get(endpoint, prompt, model_name, prompt_version)
+        if cached is not None:
+            _metrics.record_cache_hit(endpoint)
+            yield cached
+            return
+
+    def produce():
+        parts = []
+        for text in generate_stream_uncached(prompt, model_name, endpoint=endpoint, **kwargs):
+            parts.append(text)
+            yield text
+        text = ''.join(parts)
+        if cache is not None and cacheable(text, validate):
+            cache.set(endpoint, prompt, model_name, text, prompt_version)
+
+    yield from _in_flight.stream(flight_key(prompt, model_name, prompt_version, kwargs), produce)
+
+
+def generate_stream_uncached(prompt, model_name=MODEL_NAME, endpoint=None, timeout=REQUEST_TIMEOUT,
+                             total_timeout=TOTAL_TIMEOUT, retries=MAX_RETRIES, **kwargs):
+    """Stream from Gemini. Transient errors are retried until the first chunk arrives."""
+    model = get_model(model_name)
+    start_time = time.perf_counter()
+
+    def start(request_timeout):
+        chunks = iter(model.generate_content(prompt, stream=True, request_options={'timeout': request_timeout},
+                                             **kwargs))
+        # Pull the first chunk here so connection errors and throttling are retried like generate()
+        return chunks, next(chunks, None)
+
+    # Any failure counts as an error, including non-transient API errors and blocked chunks
+    # (chunk.text raises ValueError); usage metadata arrives with the last chunk
+    parts = []
+    try:
+        chunks, first = call_with_retries(start, timeout, total_timeout, retries)
+        last = first
+        if first is not None:
+            parts.append(first.text)
+            yield first.text
+        for chunk in chunks:
+            last = chunk
+            parts.append(chunk.text)
+            yield chunk.text
+    except Exception as e:
+        _metrics.record(endpoint, model_name, time.perf_counter() - start_time, error=True)
+        if isinstance(e, TRANSIENT_ERRORS):
+            raise LLMError(f"Gemini stream interrupted: {e}") from e
+        raise
+    prompt_tokens, output_tokens = usage_tokens(last, prompt, ''.join(parts))
+    _metrics.record(endpoint, model_name, time.perf_counter() - start_time, prompt_tokens, output_tokens)
+
+
+def in_flight_stats():
+    return _in_flight.stats()
+
+
+def get_metrics():
+    return _metrics
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Export this process's metrics on port, if one is configured.
+
+    Only the app calls this, not every importer of llm. Returns None when no port is set or
+    it is already taken, e.g. by another app process on the same host.
+    """
+    if not port:
+        return None
+    try:
+        return serve_metrics(_metrics, port)
+    except OSError as e:
+        warnings.warn(f"LLM metrics exporter not started on port {port}: {e}")
+        return None
+
+
+def generate_uncached(prompt, model_name=MODEL_NAME, endpoint=None, timeout=REQUEST_TIMEOUT,
+                      total_timeout=TOTAL_TIMEOUT, retries=MAX_RETRIES, **kwargs):
+    """Call Gemini, retrying transient errors until the total deadline passes."""
+    model = get_model(model_name)
+    start_time = time.perf_counter()
+    try:
+        response = call_with_retries(
+            lambda request_timeout: model.generate_content(prompt, request_options={'timeout': request_timeout},
+                                                           **kwargs),
+            timeout, total_timeout, retries,
+        )
+        text = response.text
+    except Exception:
+        # Includes non-transient API errors, and the ValueError response.text raises for blocked candidates
+        _metrics.record(endpoint, model_name, time.perf_counter() - start_time, error=True)
+        raise
+    prompt_tokens, output_tokens = usage_tokens(response, prompt, text)
+    _metrics.record(endpoint, model_name, time.perf_counter() - start_time, prompt_tokens, output_tokens)
+    return text
+
+
+def call_with_retries(call, timeout=REQUEST_TIMEOUT, total_timeout=TOTAL_TIMEOUT, retries=MAX_RETRIES):
+    """Run call(request_timeout), retrying transient errors with backoff until the total deadline passes."""
+    deadline = time.monotonic() + total_timeout
+    last_error = None
+    for attempt in range(retries + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not _rate_limiter.acquire(timeout=remaining):
+            break
+        try:
+            return call(min(timeout, remaining))
+        except TRANSIENT_ERRORS as e:
+            last_error = e
+        if attempt < retries:
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                break
+            time.sleep(delay)
+    raise LLMError(f"Gemini request failed: {last_error or 'deadline exceeded'}")
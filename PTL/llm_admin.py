@@ -0,0 +1,64 @@
+import sys
+import streamlit as st
+import pandas as pd
+from llm import get_cache, get_metrics, in_flight_stats
+from semantic_cache import SIMILARITY_THRESHOLD, get_semantic_cache
+
+
+def main():
+    st.write("Gemini usage by endpoint since this server process started.")
+
+    metrics = get_metrics()
+    rows = metrics.snapshot()
+    if rows:
+        df = pd.DataFrame(rows)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Requests", int(df['requests'].sum()))
+        col2.metric("Errors", int(df['errors'].sum()))
+        col3.metric("Tokens", int(df['prompt_tokens'].sum() + df['output_tokens'].sum()))
+        col4.metric("Estimated cost", f"${df['cost_usd'].sum():.4f}")
+
+        st.subheader("Per endpoint")
+        st.dataframe(df.sort_values('cost_usd', ascending=False), use_container_width=True)
+        st.bar_chart(df.set_index('endpoint')[['prompt_tokens', 'output_tokens']])
+        st.bar_chart(df.set_index('endpoint')[['mean_latency_s', 'p95_latency_s']])
+    else:
+        st.info("No Gemini calls have been made yet.")
+
+    st.subheader("Response cache")
+    cache = get_cache()
+    if cache is not None:
+        stats = cache.stats()
+        st.write(f"{stats['entries']} entries, {stats['size_bytes'] / 1024:.0f} KB")
+        if stats['endpoints']:
+            st.dataframe(pd.DataFrame.from_dict(stats['endpoints'], orient='index'), use_container_width=True)
+    else:
+        st.write("Disabled")
+
+    st.subheader("Semantic cache")
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        st.write(f"Similarity threshold: {SIMILARITY_THRESHOLD}")
+        stats = semantic_cache.stats()
+        if stats:
+            st.dataframe(pd.DataFrame.from_dict(stats, orient='index'), use_container_width=True)
+    else:
+        st.write("Disabled")
+
+    st.subheader("Coalesced requests")
+    st.write(in_flight_stats())
+
+    st.subheader("Image classifier")
+    # Read from the Home page's module rather than importing it, which would load the model here
+    home = sys.modules.get('home')
+    if home is not None:
+        st.json(home.model.stats())
+    else:
+        st.write("The Home page hasn't been opened in this server process yet.")
+
+    st.download_button("Download Prometheus metrics", metrics.to_prometheus(), file_name="llm_metrics.prom",
+                       mime="text/plain")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import re
+import time
+from sqlite_store import SQLiteStore
+
+# Disk-backed cache of LLM responses shared by every worker process on the host.
+# SQLite in WAL mode handles concurrent readers and writers across processes.
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+
+HOUR = 3600
+DAY = 24 * HOUR
+# How long a response stays valid, per endpoint. Food facts change slowly; personalised
+# advice is kept for less time.
+ENDPOINT_TTLS = {
+    'analyze_food': 30 * DAY,
+    'assess_ingredient_safety': 30 * DAY,
+    'assess_ingredients_batch': 30 * DAY,
+    'analyze_ingredients': 7 * DAY,
+    'predict_health_risks': 7 * DAY,
+    'get_ai_recommendations': DAY,
+    'generate_diet_plan': DAY,
+    'generate_roadmap': DAY,
+}
+DEFAULT_TTL = DAY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+CREATE TABLE IF NOT EXISTS stats (
+    endpoint TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def normalize_prompt(prompt):
+    return re.sub(r'\s+', ' ', prompt).strip().lower()
+
+
+def cache_key(prompt, model_name, prompt_version):
+    raw = f"{model_name}\0{prompt_version}\0{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMCache(SQLiteStore):
+    """Responses keyed by normalised prompt, model name and prompt-template version.
+
+    Entries expire after their endpoint's TTL and the least recently used ones are evicted
+    once the stored responses exceed max_bytes. Hit/miss counters are kept per endpoint in
+    the database, so they add up across processes.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, ttls=None):
+        super().__init__(path, SCHEMA)
+        self.max_bytes = max_bytes
+        self.ttls = ENDPOINT_TTLS if ttls is None else ttls
+
+    def get(self, endpoint, prompt, model_name, prompt_version=1):
+        key = cache_key(prompt, model_name, prompt_version)
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute("SELECT response, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            if row is not None:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count(endpoint, 'misses')
+            return None
+        conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self._count(endpoint, 'hits')
+        return row[0]
+
+    def contains(self, prompt, model_name, prompt_version=1):
+        """Whether a live entry exists, without counting a hit or miss or refreshing its LRU position."""
+        key = cache_key(prompt, model_name, prompt_version)
+        row = self._connection().execute(
+            "SELECT 1 FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def set(self, endpoint, prompt, model_name, response, prompt_version=1):
+        key = cache_key(prompt, model_name, prompt_version)
+        now = time.time()
+        ttl = self.ttls.get(endpoint, DEFAULT_TTL)
+        size = len(response.encode('utf-8'))
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, endpoint, response, size, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, endpoint, response, size, now + ttl, now),
+        )
+        self._evict()
+
+    def _evict(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not oldest:
+                break
+            removed = 0
+            for key, size in oldest:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                removed += size
+                if total - removed <= self.max_bytes:
+                    break
+            total -= removed
+
+    def stats(self):
+        conn = self._connection()
+        rows = conn.execute("SELECT endpoint, hits, misses FROM stats ORDER BY endpoint").fetchall()
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            'entries': entries,
+            'size_bytes': size,
+            'endpoints': {endpoint: {'hits': hits, 'misses': misses} for endpoint, hits, misses in rows},
+        }
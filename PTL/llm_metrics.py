@@ -0,0 +1,172 @@
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-endpoint accounting of Gemini calls: request and error counts, token usage, latency
+# histograms and an estimated cost. Kept in memory for this process and exported in the
+# Prometheus text format.
+
+METRICS_PORT = int(os.getenv("LLM_METRICS_PORT", 0))
+
+# Upper bounds of the latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+# USD per million (prompt, output) tokens. Estimates only; keep in step with the published pricing.
+MODEL_PRICES = {
+    'gemini-pro': (0.50, 1.50),
+    'gemini-1.0-pro': (0.50, 1.50),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-1.5-pro': (1.25, 5.00),
+}
+UNLABELLED = 'unlabelled'
+
+
+def estimate_tokens(text):
+    # Rough rule of thumb for English text, used when the API reports no usage
+    return max(1, len(text) // 4) if text else 0
+
+
+def usage_tokens(response, prompt, text):
+    """(prompt_tokens, output_tokens) from the response's usage metadata, or estimated from the text."""
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', 0) or estimate_tokens(prompt)
+    output_tokens = getattr(usage, 'candidates_token_count', 0) or estimate_tokens(text)
+    return prompt_tokens, output_tokens
+
+
+def estimate_cost(model_name, prompt_tokens, output_tokens, prices=MODEL_PRICES):
+    prompt_price, output_price = prices.get(model_name, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + output_tokens * output_price) / 1e6
+
+
+class LLMMetrics:
+    def __init__(self, buckets=LATENCY_BUCKETS, prices=MODEL_PRICES):
+        self.buckets = tuple(buckets)
+        self.prices = prices
+        self.lock = threading.Lock()
+        self.series = {}
+        self.cache_hits = {}
+
+    def _series(self, endpoint, model_name):
+        key = (endpoint or UNLABELLED, model_name)
+        if key not in self.series:
+            self.series[key] = {
+                'requests': 0,
+                'errors': 0,
+                'prompt_tokens': 0,
+                'output_tokens': 0,
+                'cost_usd': 0.0,
+                'latency_sum': 0.0,
+                # One count per bucket plus the +Inf overflow
+                'latency_buckets': [0] * (len(self.buckets) + 1),
+            }
+        return self.series[key]
+
+    def record(self, endpoint, model_name, seconds, prompt_tokens=0, output_tokens=0, error=False):
+        """Record one call, including its retries. Failed calls count towards errors and latency only."""
+        with self.lock:
+            series = self._series(endpoint, model_name)
+            series['requests'] += 1
+            series['latency_sum'] += seconds
+            series['latency_buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            if error:
+                series['errors'] += 1
+                return
+            series['prompt_tokens'] += prompt_tokens
+            series['output_tokens'] += output_tokens
+            series['cost_usd'] += estimate_cost(model_name, prompt_tokens, output_tokens, self.prices)
+
+    def record_cache_hit(self, endpoint):
+        with self.lock:
+            endpoint = endpoint or UNLABELLED
+            self.cache_hits[endpoint] = self.cache_hits.get(endpoint, 0) + 1
+
+    def percentile(self, counts, q):
+        """Upper bucket bound containing the q-th quantile of a latency histogram."""
+        total = sum(counts)
+        if not total:
+            return 0.0
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        """One row per (endpoint, model), for display."""
+        with self.lock:
+            rows = []
+            for (endpoint, model_name), series in sorted(self.series.items()):
+                requests = series['requests']
+                rows.append({
+                    'endpoint': endpoint,
+                    'model': model_name,
+                    'requests': requests,
+                    'errors': series['errors'],
+                    'cache_hits': self.cache_hits.get(endpoint, 0),
+                    'prompt_tokens': series['prompt_tokens'],
+                    'output_tokens': series['output_tokens'],
+                    'mean_latency_s': series['latency_sum'] / requests if requests else 0.0,
+                    'p95_latency_s': self.percentile(series['latency_buckets'], 0.95),
+                    'cost_usd': series['cost_usd'],
+                })
+            return rows
+
+    def to_prometheus(self):
+        with self.lock:
+            lines = []
+
+            def metric(name, kind, help_text, samples):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {value}")
+
+            def per_series(field):
+                return [({'endpoint': e, 'model': m}, s[field]) for (e, m), s in sorted(self.series.items())]
+
+            metric('llm_requests_total', 'counter', 'Gemini calls, including failed ones.', per_series('requests'))
+            metric('llm_errors_total', 'counter', 'Gemini calls that failed after retries.', per_series('errors'))
+            metric('llm_prompt_tokens_total', 'counter', 'Prompt tokens sent.', per_series('prompt_tokens'))
+            metric('llm_output_tokens_total', 'counter', 'Output tokens received.', per_series('output_tokens'))
+            metric('llm_cost_usd_total', 'counter', 'Estimated spend in USD.', per_series('cost_usd'))
+            metric('llm_cache_hits_total', 'counter', 'Calls answered from the response cache.',
+                   [({'endpoint': e}, n) for e, n in sorted(self.cache_hits.items())])
+
+            name = 'llm_request_duration_seconds'
+            lines.append(f"# HELP {name} Latency of Gemini calls, including retries.")
+            lines.append(f"# TYPE {name} histogram")
+            for (endpoint, model_name), series in sorted(self.series.items()):
+                labels = f'endpoint="{endpoint}",model="{model_name}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), series['latency_buckets']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {series['latency_sum']}")
+                lines.append(f"{name}_count{{{labels}}} {series['requests']}")
+            return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(metrics, port=METRICS_PORT):
+    """Serve metrics.to_prometheus() on http://0.0.0.0:port/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
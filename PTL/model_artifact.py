@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import time
+import multiprocessing as mp
+import numpy as np
+from inference import MODEL_PATH, ARTIFACT_DIR, TFLITE_PATH, IMG_SIZE, load_backend
+
+# Usage:
+#   python model_artifact.py export [--model food101_mobilenetv2.h5] [--output food101_mobilenetv2_artifact]
+#   python model_artifact.py compare [--workers 4]
+#
+# The artifact is a directory holding the architecture (model.json), every weight tensor packed
+# into one aligned, uncompressed weights.bin, and an index of their offsets (weights.json).
+# Loading maps weights.bin read-only instead of parsing HDF5.
+
+ALIGNMENT = 64
+
+
+def export_artifact(model_path=MODEL_PATH, output_dir=ARTIFACT_DIR):
+    import tensorflow as tf
+    model = tf.keras.models.load_model(model_path)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'model.json'), 'w') as f:
+        f.write(model.to_json())
+
+    index = []
+    offset = 0
+    with open(os.path.join(output_dir, 'weights.bin'), 'wb') as f:
+        for weight in model.get_weights():
+            weight = np.ascontiguousarray(weight)
+            padding = -offset % ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+            index.append({'dtype': weight.dtype.str, 'shape': list(weight.shape), 'offset': offset})
+            f.write(weight.tobytes())
+            offset += weight.nbytes
+    with open(os.path.join(output_dir, 'weights.json'), 'w') as f:
+        json.dump(index, f)
+    return output_dir
+
+
+def map_weights(artifact_dir=ARTIFACT_DIR):
+    """Return zero-copy, read-only views of every weight tensor in weights.bin."""
+    with open(os.path.join(artifact_dir, 'weights.json')) as f:
+        index = json.load(f)
+    blob = np.memmap(os.path.join(artifact_dir, 'weights.bin'), dtype=np.uint8, mode='r')
+    weights = []
+    for entry in index:
+        dtype = np.dtype(entry['dtype'])
+        count = int(np.prod(entry['shape'], dtype=np.int64))
+        weights.append(np.frombuffer(blob, dtype=dtype, count=count, offset=entry['offset']).reshape(entry['shape']))
+    return weights
+
+
+def load_artifact(artifact_dir=ARTIFACT_DIR):
+    import tensorflow as tf
+    with open(os.path.join(artifact_dir, 'model.json')) as f:
+        model = tf.keras.models.model_from_json(f.read())
+    model.set_weights(map_weights(artifact_dir))
+    return model
+
+
+def memory_usage_mb():
+    # RSS counts shared pages in full for every process; PSS splits them between the sharers
+    usage = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            if key in ('Rss', 'Pss'):
+                usage[key.lower() + '_mb'] = int(value.split()[0]) / 1024
+    return usage
+
+
+def _measure_worker(backend_name, kwargs, barrier, results):
+    start = time.perf_counter()
+    backend = load_backend(backend_name, num_threads=1, **kwargs)
+    load_s = time.perf_counter() - start
+    backend.predict(np.zeros((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32))
+    # Measure while every worker is alive so shared pages are actually shared
+    barrier.wait()
+    results.put({'load_s': load_s, **memory_usage_mb()})
+    barrier.wait()
+
+
+def compare(workers):
+    configs = [
+        ('keras', 'keras', {'model_path': MODEL_PATH}),
+        ('keras-mmap', 'keras-mmap', {'model_path': ARTIFACT_DIR}),
+        ('tflite', 'tflite', {'model_path': TFLITE_PATH}),
+        ('tflite shared', 'tflite', {'model_path': TFLITE_PATH, 'share_weights': True}),
+    ]
+    ctx = mp.get_context('spawn')
+    print(f"{workers} workers per configuration")
+    for label, backend_name, kwargs in configs:
+        if not os.path.exists(kwargs['model_path']):
+            print(f"{label:<14} skipped: {kwargs['model_path']} not found")
+            continue
+        barrier = ctx.Barrier(workers)
+        results = ctx.Queue()
+        processes = [ctx.Process(target=_measure_worker, args=(backend_name, kwargs, barrier, results))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        measured = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        print(f"{label:<14} load {np.mean([m['load_s'] for m in measured]) * 1000:8.0f} ms   "
+              f"RSS/worker {np.mean([m['rss_mb'] for m in measured]):7.0f} MB   "
+              f"PSS/worker {np.mean([m['pss_mb'] for m in measured]):7.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export')
+    export_parser.add_argument('--model', default=MODEL_PATH)
+    export_parser.add_argument('--output', default=ARTIFACT_DIR)
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print(f"Exported {export_artifact(args.model, args.output)}")
+    else:
+        compare(args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,14 @@
 import streamlit as st
 import requests
 import json
-import google.generativeai as genai
 from PIL import Image
 import matplotlib.pyplot as plt
 import re
 import os 
+from llm import generate, generate_stream
+from token_budget import length_hint
 # Configuration
 OCR_API_KEY = os.getenv("OCR_API_KEY")
-GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
-
-# Configure Gemini API
-genai.configure(api_key=GOOGLE_API_KEY)
 
 # Custom CSS to improve the app's appearance
 st.markdown("""
@@ -58,10 +55,8 @@ def ocr_space_file(uploaded_file, api_key=OCR_API_KEY, language='eng'):
     
     return None
 
-def analyze_ingredients(ingredients):
-    """Analyze ingredients using Gemini API and return analysis and ingredient counts."""
-    model = genai.GenerativeModel('gemini-pro')
-    prompt = f"""
+def ingredient_analysis_prompt(ingredients):
+    return f"""
     Analyze the following list of ingredients:
     {ingredients}
     
@@ -76,11 +71,22 @@ def analyze_ingredients(ingredients):
     At the end, provide a count of healthy ingredients and potentially concerning ingredients in the format:
     HEALTHY_COUNT: X
     CONCERNING_COUNT: Y
+
+    {length_hint('analyze_ingredients')} Always end with the two count lines.
     """
-    response = model.generate_content(prompt)
-    analysis = response.text
-    
-    # Extract counts from the analysis
+
+def analyze_ingredients(ingredients):
+    """Analyze ingredients using Gemini API and return analysis and ingredient counts."""
+    analysis = generate(ingredient_analysis_prompt(ingredients), endpoint='analyze_ingredients')
+    healthy_count, concerning_count = count_ingredients(analysis)
+    return analysis, healthy_count, concerning_count
+
+def stream_ingredient_analysis(ingredients):
+    """Yield the ingredient analysis as it is generated; parse the counts from the full text afterwards."""
+    return generate_stream(ingredient_analysis_prompt(ingredients), endpoint='analyze_ingredients')
+
+def count_ingredients(analysis):
+    """Extract the healthy and concerning ingredient counts from the analysis text."""
     healthy_count = 0
     concerning_count = 0
     
@@ -102,7 +108,7 @@ def analyze_ingredients(ingredients):
     if healthy_count == 0 and concerning_count == 0:
         healthy_count = 1
     
-    return analysis, healthy_count, concerning_count
+    return healthy_count, concerning_count
 
 def create_pie_chart(healthy_count, concerning_count):
     """Create a pie chart of healthy vs. potentially concerning ingredients."""
@@ -140,10 +146,9 @@ def main():
                     st.subheader("📋 Extracted Ingredients:")
                     st.write(ingredients_text)
                     
-                    with st.spinner("Analyzing ingredients..."):
-                        analysis, healthy_count, concerning_count = analyze_ingredients(ingredients_text)
                     st.subheader("🧪 Ingredient Analysis:")
-                    st.write(analysis)
+                    analysis = st.write_stream(stream_ingredient_analysis(ingredients_text))
+                    healthy_count, concerning_count = count_ingredients(analysis)
                     
                     st.subheader("📊 Ingredient Health Proportion:")
                     st.write(f"Healthy Ingredients: {healthy_count}")
@@ -0,0 +1,64 @@
+import threading
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from inference import IMG_SIZE
+
+SCALE = np.float32(1.0 / 255.0)
+
+# Per-thread input buffers, grown on demand and reused between calls
+_buffers = threading.local()
+
+
+def open_image(source):
+    """Open image bytes, a file-like object or a PIL image without decoding the pixels yet."""
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    return Image.open(source)
+
+
+def decode_image(source, size=IMG_SIZE):
+    """Decode an image straight to a size x size RGB image.
+
+    JPEGs are decoded at a reduced scale (DCT scaling via draft mode), so a 12 MP phone
+    photo never gets fully decompressed just to be thrown away by the resize.
+    """
+    img = open_image(source)
+    if img.format == 'JPEG':
+        img.draft('RGB', (size, size))
+
+    # Normalise channel layout: flatten transparency onto white, expand grayscale/palette to RGB
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    if img.size != (size, size):
+        img = img.resize((size, size), Image.BICUBIC, reducing_gap=3.0)
+    return img
+
+
+def batch_buffer(batch_size, size=IMG_SIZE):
+    buffer = getattr(_buffers, 'array', None)
+    if buffer is None or buffer.shape[0] < batch_size or buffer.shape[1] != size:
+        buffer = np.empty((batch_size, size, size, 3), dtype=np.float32)
+        _buffers.array = buffer
+    return buffer[:batch_size]
+
+
+def preprocess_batch(sources, size=IMG_SIZE):
+    """Decode and normalise images into a float32 batch in [0, 1].
+
+    The uint8 -> float32 conversion and the scaling happen in one pass, written into a
+    per-thread buffer. The returned array is overwritten by the next call on this thread.
+    """
+    batch = batch_buffer(len(sources), size)
+    for i, source in enumerate(sources):
+        pixels = np.asarray(decode_image(source, size), dtype=np.uint8)
+        np.multiply(pixels, SCALE, out=batch[i], casting='unsafe')
+    return batch
@@ -0,0 +1,54 @@
+import datetime
+import json
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not serialised
+    fcntl = None
+
+# Append-only log of the questions users ask, one JSON line per query in a file per day.
+# cache_warmer.py reads it to find the most popular queries.
+
+QUERY_LOG_DIR = os.getenv("QUERY_LOG_DIR", "query_log")
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "1") == "1"
+
+
+def log_query(endpoint, **params):
+    """Append a query to today's log. Never raises: a failed write just loses that record."""
+    if not QUERY_LOG_ENABLED:
+        return
+    try:
+        now = time.time()
+        os.makedirs(QUERY_LOG_DIR, exist_ok=True)
+        path = os.path.join(QUERY_LOG_DIR, f"{datetime.date.fromtimestamp(now).isoformat()}.jsonl")
+        line = json.dumps({'ts': now, 'endpoint': endpoint, 'params': params}) + '\n'
+        with open(path, 'a', encoding='utf-8') as f:
+            # Other app processes append to the same file
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(line)
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+def read_queries(days=7, endpoint=None, log_dir=QUERY_LOG_DIR):
+    """Logged queries from the last days days, oldest first; unreadable lines are skipped."""
+    if not os.path.isdir(log_dir):
+        return
+    since = time.time() - days * 86400
+    first_day = datetime.date.fromtimestamp(since).isoformat()
+    for name in sorted(os.listdir(log_dir)):
+        if not name.endswith('.jsonl') or name[:-len('.jsonl')] < first_day:
+            continue
+        with open(os.path.join(log_dir, name), encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record['ts'] >= since and (endpoint is None or record['endpoint'] == endpoint):
+                    yield record
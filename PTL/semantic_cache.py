@@ -0,0 +1,311 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+from llm_cache import DEFAULT_TTL, ENDPOINT_TTLS
+from sqlite_store import SQLiteStore
+
+# Answers for free-text food queries, matched by similarity instead of exact text so that
+# "Pizza", "pizza slice" and "cheese pizza" can share one LLM answer. Queries are embedded
+# locally as TF-IDF vectors over hashed character n-grams, so no model or network access
+# is needed. Entries live in SQLite; every process keeps an in-memory index of the live
+# queries' sparse vectors and reads a response only when it is served.
+#
+# Character n-grams alone score "apple" about as close to "apple pie" as "cheese pizza" is
+# to "pizza", so candidates must also share the query's head noun (its last word, which in
+# English names the dish) and are only then ranked by cosine similarity. They also score
+# "shrimp fried rice" above "cheese pizza", so a query that adds or drops an allergen or
+# protein word never matches. IDF weights are computed once from the classifier labels and
+# stored with the cache, so scores don't drift with how many entries a namespace holds.
+
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache.sqlite3")
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+# Minimum cosine similarity, among comparable entries, for serving a previous answer. With the
+# label IDF: "cheese pizza"/"pizza" 0.71, "vanilla ice cream"/"ice cream" 0.69 match;
+# "rice"/"fried rice" 0.64, "green salad"/"greek salad" 0.61 don't.
+SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.65))
+HASH_DIM = 2 ** 12
+NGRAM_SIZES = (2, 3, 4)
+# Serving sizes that don't change what the food is
+PORTION_WORDS = {'a', 'an', 'of', 'some', 'slice', 'piece', 'bowl', 'plate', 'serving', 'portion'}
+# Words that change what is in the dish enough that answers can't be shared (allergens and
+# proteins). Dairy and wheat are left out: they are in most of the dishes they'd qualify.
+SUBSTANTIVE_WORDS = {
+    'shrimp', 'prawn', 'crab', 'lobster', 'shellfish', 'clam', 'mussel', 'oyster', 'scallop', 'squid',
+    'fish', 'tuna', 'salmon', 'cod', 'anchovy', 'egg', 'peanut', 'nut', 'almond', 'walnut', 'cashew',
+    'pecan', 'hazelnut', 'pistachio', 'sesame', 'soy', 'tofu', 'chicken', 'beef', 'pork', 'lamb',
+    'bacon', 'ham', 'turkey', 'duck', 'sausage', 'pepperoni',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    query TEXT NOT NULL,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    UNIQUE (namespace, query)
+);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+CREATE TABLE IF NOT EXISTS rejected (
+    namespace TEXT NOT NULL,
+    query TEXT NOT NULL,
+    matched TEXT NOT NULL,
+    PRIMARY KEY (namespace, query, matched)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    endpoint TEXT PRIMARY KEY,
+    lookups INTEGER NOT NULL DEFAULT 0,
+    exact_hits INTEGER NOT NULL DEFAULT 0,
+    semantic_hits INTEGER NOT NULL DEFAULT 0,
+    false_hits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_lock = threading.Lock()
+_cache = None
+
+
+def singular(word):
+    if len(word) <= 3 or word.endswith(('ss', 'us')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def normalize_query(text):
+    """Lowercase, singular words without punctuation or portion words: "2 Slices of Pizza" -> "2 pizza"."""
+    words = [singular(word) for word in re.sub(r'[^a-z0-9]+', ' ', text.lower()).split()]
+    return ' '.join([word for word in words if word not in PORTION_WORDS] or words)
+
+
+def head_word(query):
+    return query.rsplit(' ', 1)[-1]
+
+
+def context_key(*parts):
+    """Short hash of whatever else the answer depends on (prompt template, other form fields)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def ngram_counts(text):
+    """Hashed character n-gram counts of an already normalised query, as {bucket: count}."""
+    counts = {}
+    padded = f" {text} "
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            bucket = zlib.crc32(padded[i:i + n].encode('utf-8')) % HASH_DIM
+            counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def reference_idf():
+    """IDF weights over the classifier labels, the vocabulary food queries are drawn from."""
+    from food_classes import food_classes
+    df = np.zeros(HASH_DIM, dtype=np.float32)
+    for name in food_classes:
+        df[list(ngram_counts(normalize_query(name.replace('_', ' '))))] += 1
+    return (np.log((1 + len(food_classes)) / (1 + df)) + 1).astype(np.float32)
+
+
+def vectorize(query, idf):
+    """Unit-length sparse TF-IDF vector of an already normalised query."""
+    vector = {bucket: count * float(idf[bucket]) for bucket, count in ngram_counts(query).items()}
+    norm = sum(weight * weight for weight in vector.values()) ** 0.5
+    return {bucket: weight / norm for bucket, weight in vector.items()} if norm else vector
+
+
+def dot(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+def comparable(a, b):
+    """Whether two normalised queries may share an answer: same head noun, same allergen/protein words."""
+    if head_word(a) != head_word(b):
+        return False
+    return not (set(a.split()) ^ set(b.split())) & SUBSTANTIVE_WORDS
+
+
+def similarity(a, b, idf):
+    """Score of normalised query a against stored query b, as the cache computes it."""
+    if not comparable(a, b):
+        return 0.0
+    return dot(vectorize(a, idf), vectorize(b, idf))
+
+
+class NgramIndex:
+    """Cosine search over TF-IDF vectors of the live queries in one namespace, grouped by head noun."""
+
+    def __init__(self, idf):
+        self.idf = idf
+        self.entries = {}
+        self.heads = {}
+
+    def add(self, query, expires_at):
+        self.entries[query] = (vectorize(query, self.idf), expires_at)
+        self.heads.setdefault(head_word(query), set()).add(query)
+
+    def remove(self, query):
+        del self.entries[query]
+        self.heads[head_word(query)].discard(query)
+
+    def search(self, query, exclude=()):
+        """(stored query, similarity) of the closest live, comparable entry, or None."""
+        now = time.time()
+        vector = vectorize(query, self.idf)
+        best = None
+        for stored in list(self.heads.get(head_word(query), ())):
+            stored_vector, expires_at = self.entries[stored]
+            if expires_at <= now:
+                self.remove(stored)
+                continue
+            if stored in exclude or not comparable(query, stored):
+                continue
+            score = dot(vector, stored_vector)
+            if best is None or score > best[1]:
+                best = (stored, score)
+        return best
+
+
+class SemanticCache(SQLiteStore):
+    def __init__(self, path=SEMANTIC_CACHE_PATH, threshold=SIMILARITY_THRESHOLD, ttls=None):
+        super().__init__(path, SCHEMA)
+        self.threshold = threshold
+        self.ttls = ENDPOINT_TTLS if ttls is None else ttls
+        self.lock = threading.Lock()
+        self.indexes = {}
+        self.last_id = 0
+        self.idf = self._load_idf()
+
+    def _load_idf(self):
+        # Computed on first use and then kept, so stored entries and new queries always share weights
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'idf'").fetchone()
+        if row is not None and len(row[0]) == HASH_DIM * 4:
+            return np.frombuffer(row[0], dtype=np.float32)
+        idf = reference_idf()
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('idf', ?)", (idf.tobytes(),))
+        return idf
+
+    def _sync(self):
+        # Picks up live entries written since the last call, including by other processes
+        rows = self._connection().execute(
+            "SELECT id, namespace, query, expires_at FROM entries WHERE id > ? AND expires_at > ? ORDER BY id",
+            (self.last_id, time.time()),
+        ).fetchall()
+        for row_id, namespace, query, expires_at in rows:
+            self.indexes.setdefault(namespace, NgramIndex(self.idf)).add(query, expires_at)
+            self.last_id = row_id
+
+    def lookup(self, endpoint, query, context=''):
+        """Closest previous answer for query, as a dict with the matched query and its similarity.
+
+        Returns None when nothing scores at least the threshold. context separates answers
+        that also depend on something other than the query text.
+        """
+        namespace = f"{endpoint}:{context}"
+        query = normalize_query(query)
+        conn = self._connection()
+        rejected = [row[0] for row in conn.execute(
+            "SELECT matched FROM rejected WHERE namespace = ? AND query = ?", (namespace, query))]
+        with self.lock:
+            self._sync()
+            index = self.indexes.get(namespace)
+            best = index.search(query, rejected) if index is not None else None
+        self._count(endpoint, 'lookups')
+        if best is None or best[1] < self.threshold:
+            return None
+        matched, score = best
+        row = conn.execute(
+            "SELECT response FROM entries WHERE namespace = ? AND query = ? AND expires_at > ?",
+            (namespace, matched, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        response = row[0]
+        exact = matched == query
+        self._count(endpoint, 'exact_hits' if exact else 'semantic_hits')
+        return {'response': response, 'matched_query': matched, 'similarity': score, 'exact': exact}
+
+    def add(self, endpoint, query, response, context=''):
+        namespace = f"{endpoint}:{context}"
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (namespace, query, response, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, normalize_query(query), response, now + self.ttls.get(endpoint, DEFAULT_TTL)),
+        )
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+    def report_false_hit(self, endpoint, query, matched_query, context=''):
+        """Record that matched_query's answer was wrong for query; that pairing is never served again."""
+        self._connection().execute(
+            "INSERT OR IGNORE INTO rejected (namespace, query, matched) VALUES (?, ?, ?)",
+            (f"{endpoint}:{context}", normalize_query(query), matched_query),
+        )
+        self._count(endpoint, 'false_hits')
+
+    def stats(self):
+        rows = self._connection().execute(
+            "SELECT endpoint, lookups, exact_hits, semantic_hits, false_hits FROM stats ORDER BY endpoint"
+        ).fetchall()
+        stats = {}
+        for endpoint, lookups, exact_hits, semantic_hits, false_hits in rows:
+            stats[endpoint] = {
+                'lookups': lookups,
+                'exact_hits': exact_hits,
+                'semantic_hits': semantic_hits,
+                'false_hits': false_hits,
+                'hit_rate': (exact_hits + semantic_hits) / lookups if lookups else 0.0,
+                # Share of near-match answers that users flagged as wrong
+                'false_hit_rate': false_hits / semantic_hits if semantic_hits else 0.0,
+            }
+        return stats
+
+
+def get_semantic_cache():
+    global _cache
+    with _lock:
+        if _cache is None and SEMANTIC_CACHE_ENABLED:
+            _cache = SemanticCache()
+        return _cache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compare_parser = subparsers.add_parser('compare', help="score a query against a stored one, as lookups do")
+    compare_parser.add_argument('query')
+    compare_parser.add_argument('stored')
+    compare_parser.add_argument('--path', default=SEMANTIC_CACHE_PATH)
+    stats_parser = subparsers.add_parser('stats')
+    stats_parser.add_argument('--path', default=SEMANTIC_CACHE_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        idf = SemanticCache(args.path).idf
+        score = similarity(normalize_query(args.query), normalize_query(args.stored), idf)
+        verdict = 'match' if score >= SIMILARITY_THRESHOLD else 'no match'
+        print(f"{score:.3f} ({verdict} at threshold {SIMILARITY_THRESHOLD})")
+    elif args.command == 'stats':
+        print(json.dumps(SemanticCache(args.path).stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+import streamlit as st
+from semantic_cache import get_semantic_cache
+
+# Page widgets around SemanticCache near-matches. Each page keeps its current near-match in
+# st.session_state under its own state_key, which also keys its feedback button.
+
+
+def note_semantic_match(state_key, query, match, context):
+    """Say which stored query's answer is shown, and keep the near-match for the feedback button."""
+    st.session_state.pop(state_key, None)
+    if match and not match['exact']:
+        st.caption(f"Showing the analysis for \"{match['matched_query']}\" (similarity {match['similarity']:.2f})")
+        st.session_state[state_key] = {'query': query, 'matched_query': match['matched_query'], 'context': context}
+
+
+def show_semantic_match_feedback(state_key, endpoint, query, context, reanalyze):
+    """Let the user reject the near-match shown for query; the rejection is counted as a false hit,
+    that pairing isn't reused, and reanalyze() is called to answer query on its own."""
+    match = st.session_state.get(state_key)
+    if not match or match['query'] != query or match['context'] != context:
+        return
+    if st.button(f"Not the same as \"{match['matched_query']}\"? Analyze \"{query}\" on its own",
+                 key=f"{state_key}_false_hit"):
+        get_semantic_cache().report_false_hit(endpoint, query, match['matched_query'], context)
+        del st.session_state[state_key]
+        reanalyze()
@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import Future
+
+# Coalesces identical concurrent calls: the first caller for a key does the work and every
+# caller that arrives while it is still running gets the same result instead of starting
+# its own. Streamlit runs every session as a thread of one process, so this covers both
+# many sessions asking the same question and one session double-clicking a button.
+
+
+class SharedStream:
+    """Buffers the chunks of one source iterator so several readers can replay them.
+
+    The source is consumed by its own thread, so a reader that stops early (e.g. a
+    Streamlit rerun interrupting the page) does not cancel the call for the others.
+    """
+
+    def __init__(self, source, on_done=None):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+        self.on_done = on_done
+        self.thread = threading.Thread(target=self._consume, args=(source,), daemon=True)
+        self.thread.start()
+
+    def _consume(self, source):
+        try:
+            for chunk in source:
+                with self.cond:
+                    self.chunks.append(chunk)
+                    self.cond.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            if self.on_done is not None:
+                self.on_done()
+            with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.chunks) and not self.done:
+                    self.cond.wait()
+                if i < len(self.chunks):
+                    chunk = self.chunks[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield chunk
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.streams = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Return fn(), or the result of the identical call already in flight for key."""
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+                self.executed += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def stream(self, key, make_iter):
+        """Iterate make_iter(), or replay and follow the identical stream already in flight for key."""
+        with self.lock:
+            shared = self.streams.get(key)
+            if shared is None:
+                shared = self.streams[key] = SharedStream(make_iter(), on_done=lambda: self._finish_stream(key))
+                self.executed += 1
+            else:
+                self.shared += 1
+        return iter(shared)
+
+    def _finish_stream(self, key):
+        with self.lock:
+            self.streams.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'in_flight': len(self.calls) + len(self.streams),
+                'executed': self.executed,
+                'shared': self.shared,
+            }
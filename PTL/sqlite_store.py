@@ -0,0 +1,31 @@
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """Base for the SQLite-backed caches: per-thread connections in WAL mode and per-endpoint counters.
+
+    Subclasses pass their schema, which must include a stats table keyed by endpoint.
+    """
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.local = threading.local()
+        self._connection().executescript(schema)
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads, so each thread opens its own
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _count(self, endpoint, column):
+        self._connection().execute(
+            f"INSERT INTO stats (endpoint, {column}) VALUES (?, 1) "
+            f"ON CONFLICT(endpoint) DO UPDATE SET {column} = {column} + 1",
+            (endpoint,),
+        )
@@ -0,0 +1,142 @@
+import argparse
+import importlib
+import os
+from llm_metrics import estimate_tokens
+
+# Output caps and generation settings per LLM endpoint. Output length is what drives our
+# response latency, so every endpoint gets a cap sized for what its page actually renders.
+ENDPOINT_BUDGETS = {
+    'analyze_food': {'max_output_tokens': 200, 'temperature': 0.2},
+    'assess_ingredient_safety': {'max_output_tokens': 350, 'temperature': 0.2},
+    'assess_ingredients_batch': {'max_output_tokens': 2048, 'temperature': 0.2},
+    'analyze_ingredients': {'max_output_tokens': 900, 'temperature': 0.3},
+    'predict_health_risks': {'max_output_tokens': 900, 'temperature': 0.3},
+    'get_ai_recommendations': {'max_output_tokens': 1000, 'temperature': 0.7},
+    'generate_diet_plan': {'max_output_tokens': 600, 'temperature': 0.7},
+    'generate_roadmap': {'max_output_tokens': 500, 'temperature': 0.5},
+}
+# Scales every cap, e.g. 0.8 to trade completeness for latency across the board
+OUTPUT_TOKEN_SCALE = float(os.getenv("LLM_OUTPUT_TOKEN_SCALE", 1.0))
+# English prose averages about 0.75 words per token; the hint aims below the cap so
+# answers finish on their own instead of being cut off
+WORDS_PER_TOKEN = 0.75
+HINT_MARGIN = 0.8
+
+# Prompt builders for the report: endpoint -> (module:function or module:TEMPLATE, sample
+# keyword arguments, the same arguments with every variable field left empty). The
+# difference between the two prompts is the variable content; the rest is template
+# boilerplate sent with every call.
+REPORT_CASES = {
+    'analyze_food': (
+        'food_kb:FOOD_ANALYSIS_PROMPT', {'food_name': 'chicken curry'}, {'food_name': ''},
+    ),
+    'assess_ingredient_safety': (
+        'ingredients:ingredient_safety_prompt',
+        {'ingredient': 'Sugar', 'quantity': '40g'},
+        {'ingredient': '', 'quantity': ''},
+    ),
+    'predict_health_risks': (
+        'disease:health_risk_prompt',
+        {'food_item': 'Pizza', 'ingredients': ['Wheat flour', 'Tomato sauce', 'Cheese', 'Pepperoni', 'Olive oil'],
+         'consumption_frequency': 'Regularly'},
+        {'food_item': '', 'ingredients': [], 'consumption_frequency': ''},
+    ),
+    'get_ai_recommendations': (
+        'diet_recommender:recommendation_prompt',
+        {'user_info': {'age': 30, 'gender': 'Male', 'weight': 70.0, 'height': 170.0,
+                       'activity_level': 'Moderately Active', 'goal': 'Lose 10kg',
+                       'health_issues': 'High blood pressure'},
+         'calorie_target': 2600.0},
+        {'user_info': {'age': '', 'gender': '', 'weight': '', 'height': '', 'activity_level': '', 'goal': '',
+                       'health_issues': ''},
+         'calorie_target': 0.0},
+    ),
+    'analyze_ingredients': (
+        'ocr:ingredient_analysis_prompt',
+        {'ingredients': 'Sugar, wheat flour, palm oil, cocoa powder, emulsifier (soy lecithin), salt, '
+                        'artificial flavour'},
+        {'ingredients': ''},
+    ),
+}
+
+
+def output_cap(endpoint):
+    budget = ENDPOINT_BUDGETS.get(endpoint)
+    if budget is None:
+        return None
+    return max(1, int(budget['max_output_tokens'] * OUTPUT_TOKEN_SCALE))
+
+
+def generation_config(endpoint):
+    """Generation config for endpoint, or None for endpoints without a budget."""
+    budget = ENDPOINT_BUDGETS.get(endpoint)
+    if budget is None:
+        return None
+    return {**budget, 'max_output_tokens': output_cap(endpoint)}
+
+
+def apply_budget(endpoint, kwargs):
+    """kwargs for generate_content with endpoint's generation config, unless the caller set one."""
+    config = generation_config(endpoint)
+    if config is None or 'generation_config' in kwargs:
+        return kwargs
+    return {**kwargs, 'generation_config': config}
+
+
+def length_hint(endpoint):
+    """Prompt sentence asking the model to stay within endpoint's output budget."""
+    words = int(output_cap(endpoint) * WORDS_PER_TOKEN * HINT_MARGIN) // 10 * 10
+    return f"Keep the whole response under {words} words."
+
+
+def items_per_request(endpoint, tokens_per_item):
+    """How many answers of tokens_per_item fit in one response of endpoint, leaving the hint margin."""
+    return max(1, int(output_cap(endpoint) * HINT_MARGIN) // tokens_per_item)
+
+
+def count_tokens(text, model=None):
+    if model is not None:
+        return model.count_tokens(text).total_tokens
+    return estimate_tokens(text)
+
+
+def prompt_split(build_prompt, sample_kwargs, blank_kwargs, model=None):
+    total = count_tokens(build_prompt(**sample_kwargs), model)
+    boilerplate = count_tokens(build_prompt(**blank_kwargs), model)
+    return {'total': total, 'boilerplate': boilerplate, 'variable': max(0, total - boilerplate)}
+
+
+def report(model=None):
+    rows = []
+    for endpoint, (target, sample_kwargs, blank_kwargs) in REPORT_CASES.items():
+        module_name, name = target.split(':')
+        build_prompt = getattr(importlib.import_module(module_name), name)
+        if isinstance(build_prompt, str):
+            build_prompt = build_prompt.format
+        split = prompt_split(build_prompt, sample_kwargs, blank_kwargs, model)
+        rows.append({'endpoint': endpoint, **split, 'output_cap': output_cap(endpoint)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    report_parser = subparsers.add_parser('report')
+    report_parser.add_argument('--api', action='store_true',
+                               help="count tokens with the Gemini API instead of estimating them offline")
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        model = None
+        if args.api:
+            from llm import get_model
+            model = get_model()
+        print(f"{'endpoint':<26}{'prompt':>8}{'boilerplate':>13}{'variable':>10}{'output cap':>12}")
+        for row in report(model):
+            share = row['boilerplate'] / row['total'] if row['total'] else 0
+            print(f"{row['endpoint']:<26}{row['total']:>8}{row['boilerplate']:>8} ({share:>3.0%}){row['variable']:>10}"
+                  f"{row['output_cap']:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import atexit
+import os
+import queue
+import threading
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from inference import BACKEND, IMG_SIZE
+from batcher import MAX_BATCH_SIZE
+
+# Number of inference processes; 0 keeps inference inside the Streamlit process
+POOL_WORKERS = int(os.getenv("INFERENCE_WORKERS", 0))
+
+
+def _worker_main(conn, backend_name, num_threads, input_name, max_batch_size):
+    # Runs in a spawned process: owns one copy of the model and a fixed slice of the cores
+    from inference import load_backend
+    backend = load_backend(backend_name, num_threads=num_threads)
+
+    shm_in = SharedMemory(name=input_name)
+    inputs = np.ndarray((max_batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32, buffer=shm_in.buf)
+    n_classes = backend.predict(np.zeros((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)).shape[1]
+    conn.send(n_classes)
+
+    shm_out = SharedMemory(name=conn.recv())
+    outputs = np.ndarray((max_batch_size, n_classes), dtype=np.float32, buffer=shm_out.buf)
+    try:
+        while True:
+            rows = conn.recv()
+            if rows is None:
+                break
+            try:
+                outputs[:rows] = backend.predict(inputs[:rows])
+                conn.send(None)
+            except Exception as e:
+                conn.send(f"{type(e).__name__}: {e}")
+    finally:
+        del inputs, outputs
+        shm_in.close()
+        shm_out.close()
+
+
+class _Worker:
+    def __init__(self, ctx, backend_name, num_threads, max_batch_size):
+        self.max_batch_size = max_batch_size
+        self.shm_in = SharedMemory(create=True, size=max_batch_size * IMG_SIZE * IMG_SIZE * 3 * 4)
+        self.inputs = np.ndarray((max_batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32, buffer=self.shm_in.buf)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, backend_name, num_threads, self.shm_in.name, max_batch_size),
+            daemon=True,
+        )
+        self.process.start()
+        # Only the child may hold its end, or recv() below would never see EOF if the child dies
+        child_conn.close()
+
+        # The worker reports the model's output width once its model is loaded
+        try:
+            n_classes = self.conn.recv()
+        except (EOFError, OSError):
+            # It died while loading (bad model file, out of memory): nothing else will free the block
+            self.process.join(timeout=5)
+            del self.inputs
+            self.shm_in.close()
+            self.shm_in.unlink()
+            raise RuntimeError(f"Inference worker exited while loading the {backend_name} backend "
+                               f"(exit code {self.process.exitcode})")
+        self.shm_out = SharedMemory(create=True, size=max_batch_size * n_classes * 4)
+        self.outputs = np.ndarray((max_batch_size, n_classes), dtype=np.float32, buffer=self.shm_out.buf)
+        self.conn.send(self.shm_out.name)
+
+    def run(self, batch):
+        rows = len(batch)
+        self.inputs[:rows] = batch
+        self.conn.send(rows)
+        error = self.conn.recv()
+        if error is not None:
+            raise RuntimeError(f"Inference worker failed: {error}")
+        return self.outputs[:rows].copy()
+
+    def close(self):
+        if self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+        del self.inputs, self.outputs
+        for shm in (self.shm_in, self.shm_out):
+            shm.close()
+            shm.unlink()
+
+
+class WorkerPool:
+    """Run the classifier in separate processes so inference never holds the Streamlit GIL.
+
+    Each worker loads its own backend with cpu_count // workers intra-op threads. Batches are
+    written into a per-worker shared-memory block and only the row count crosses the pipe.
+    Exposes the same predict(batch) method as the backends in inference.py.
+    """
+
+    def __init__(self, workers=POOL_WORKERS, backend_name=BACKEND, max_batch_size=MAX_BATCH_SIZE):
+        self.name = f"pool:{backend_name}"
+        self.max_batch_size = max_batch_size
+        self.backend_name = backend_name
+        self.num_threads = max(1, (os.cpu_count() or 1) // workers)
+        self.ctx = mp.get_context("spawn")
+        self.idle = queue.Queue()
+        # predict() replaces dead workers from whichever thread noticed, so the list is shared
+        self.lock = threading.Lock()
+        self.workers = []
+        for _ in range(workers):
+            worker = self._start_worker()
+            self.workers.append(worker)
+            self.idle.put(worker)
+        atexit.register(self.close)
+
+    def _start_worker(self):
+        return _Worker(self.ctx, self.backend_name, self.num_threads, self.max_batch_size)
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        worker = self.idle.get()
+        try:
+            chunks = [worker.run(batch[i:i + self.max_batch_size])
+                      for i in range(0, len(batch), self.max_batch_size)]
+            return np.concatenate(chunks)
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            # The worker process died; replace it so the pool keeps its size
+            worker.close()
+            with self.lock:
+                self.workers.remove(worker)
+            worker = None
+            replacement = self._start_worker()
+            with self.lock:
+                self.workers.append(replacement)
+            worker = replacement
+            raise RuntimeError("Inference worker exited unexpectedly")
+        finally:
+            # A replacement that failed to start is simply not returned to the pool
+            if worker is not None:
+                self.idle.put(worker)
+
+    def close(self):
+        with self.lock:
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.close()